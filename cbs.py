@@ -1,12 +1,24 @@
 import itertools
+from collections import OrderedDict
 import time as timer
 import heapq
 import random
 
 import numpy as np
 
-from single_agent_planner import compute_heuristics, a_star, get_location, get_sum_of_cost
-from copy import deepcopy
+from single_agent_planner import get_location, get_sum_of_cost, build_constraint_table, ConflictAvoidanceTable
+from coupled_search import joint_a_star, MAX_META_AGENT_SIZE
+from prioritized import PrioritizedPlanningSolver
+from low_level import get_low_level_search
+from collision_detection import detect_collisions_vectorized, detect_collisions_with, VECTORIZE_MIN_PATHS
+from grid_map import as_grid_map
+from heuristic_cache import get_heuristics
+from mdd import MDD, classify_collision, CARDINAL
+from high_level_heuristics import get_high_level_heuristic, compute_heuristic
+
+# Maximum number of MDDs a CBSSolver keeps, the least recently used ones are dropped first (see CBSSolver.get_mdd)
+MDD_CACHE_SIZE = 1024
+
 
 def detect_collision(path1: list, path2: list) -> tuple:
     """"For two anonymous paths, return the location and timestep for the first collision. That can be either a
@@ -70,6 +82,83 @@ def detect_collisions(paths):
     return collisions
 
 
+def update_collision_matrix(collision_matrix: dict, paths: list, agent: int) -> dict:
+    """Returns the collision matrix of the paths after the path of one agent changed.
+
+    The collision matrix maps every pair of agents (a1, a2) with a1 < a2 that collide to their first collision (a
+    collision dictionary as in detect_collisions). Only the pairs involving the replanned agent are recomputed, the
+    others are taken over from the given collision_matrix (which is not modified).
+
+    :param collision_matrix: the collision matrix before the path of agent changed
+    :param paths: the paths of all agents, including the new path of agent
+    :param agent: the replanned agent
+
+    :return the updated collision matrix
+    """
+    matrix = {pair: collision for pair, collision in collision_matrix.items() if agent not in pair}
+
+    others = [other for other in range(len(paths)) if other != agent]
+    if len(others) < VECTORIZE_MIN_PATHS:
+        collisions = [detect_collision(paths[agent], paths[other]) for other in others]
+    else:
+        collisions = detect_collisions_with(paths[agent], [paths[other] for other in others])
+
+    for other, (col_loc, col_time) in zip(others, collisions):
+        a1, a2 = min(agent, other), max(agent, other)
+
+        if col_loc is not None:
+            if a1 != agent and type(col_loc) is list:
+                col_loc = col_loc[::-1]  # edge collisions are stored from the point of view of a1
+
+            matrix[(a1, a2)] = {
+                'a1': a1,
+                'a2': a2,
+                'loc': col_loc,
+                'timestep': col_time
+            }
+
+    return matrix
+
+
+def get_collisions(collision_matrix: dict) -> list:
+    """Returns the collisions of a collision matrix as list, in the same order as detect_collisions."""
+    return [collision_matrix[pair] for pair in sorted(collision_matrix)]
+
+
+def get_constraints(constraint_chain, agent: int = None) -> list:
+    """Materializes the constraints of a CBS node.
+
+    The constraints of a node are stored as a chain (constraint, parent chain) that ends with None at the root, so a
+    child node only adds its own constraint and shares the rest with its parent.
+
+    :param constraint_chain: the 'constraints' of a node
+    :param agent: only return the constraints relevant to this agent, or all constraints if None
+
+    :return list of constraints, the most recent one first
+    """
+    constraints = []
+    while constraint_chain is not None:
+        constraint, constraint_chain = constraint_chain
+        # positive constraints of other agents also constrain the agent, see build_constraint_table
+        if agent is None or constraint['agent'] == agent or constraint.get('positive', False):
+            constraints.append(constraint)
+    return constraints
+
+
+def constraint_key(constraint) -> tuple:
+    """Returns the constraint in a hashable form, an edge location as a tuple of two locations."""
+    loc = constraint['loc']
+    if isinstance(loc[0], tuple):
+        loc = (tuple(loc[0]), tuple(loc[1]))
+    return constraint['agent'], tuple(loc), constraint['timestep'], constraint.get('positive', False)
+
+
+def add_constraint_hash(constraint_hash: int, constraint) -> int:
+    """Returns the hash of a set of constraints with the given hash after adding the constraint. The hash of a set is
+    the sum of the hashes of its constraints, so it does not depend on the order in which they were added."""
+    return (constraint_hash + hash(constraint_key(constraint))) & 0xFFFFFFFFFFFFFFFF
+
+
 def standard_splitting(collision):
     ##############################
     # Task 3.2: Return a list of (two) constraints to resolve the given collision
@@ -93,7 +182,7 @@ def standard_splitting(collision):
     return constraints
 
 
-def disjoint_splitting(collision):
+def disjoint_splitting(collision, rng=random):
     ##############################
     # Task 4.1: Return a list of (two) constraints to resolve the given collision
     #           Vertex collision: the first constraint enforces one agent to be at the specified location at the
@@ -104,126 +193,424 @@ def disjoint_splitting(collision):
     #                          specified edge at the specified timestep
     #           Choose the agent randomly
 
-    pass
+    if rng.randint(0, 1) == 0:
+        agent, loc = collision['a1'], collision['loc']
+    else:
+        agent = collision['a2']
+        loc = collision['loc'] if type(collision['loc']) is tuple else collision['loc'][::-1]
+
+    return [
+        {'agent': agent, 'loc': loc, 'timestep': collision['timestep'], 'positive': True},
+        {'agent': agent, 'loc': loc, 'timestep': collision['timestep'], 'positive': False}
+    ]
+
+
+def paths_violate_constraint(constraint: dict, paths) -> list:
+    """Returns the agents (other than the constrained agent) whose paths violate the negative constraints that follow
+    from a positive constraint, see build_constraint_table.
+
+    :param constraint: a positive constraint
+    :param paths: the paths of all agents
+
+    :return list of agents that have to be replanned
+    """
+    loc, time = constraint['loc'], constraint['timestep']
+
+    agents = []
+    for agent, path in enumerate(paths):
+        if agent == constraint['agent']:
+            continue
+
+        curr_loc = get_location(path, time)
+        if type(loc) is tuple:
+            violated = curr_loc == loc
+        else:
+            prev_loc = get_location(path, time - 1)
+            violated = prev_loc == loc[0] or curr_loc == loc[1] or (prev_loc == loc[1] and curr_loc == loc[0])
+
+        if violated:
+            agents.append(agent)
+
+    return agents
 
 
 class CBSSolver(object):
     """The high-level search of CBS."""
 
-    def __init__(self, my_map, starts, goals):
-        """my_map   - list of lists specifying obstacle positions
+    def __init__(self, my_map, starts, goals, low_level='A*', high_level_heuristic=None):
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        low_level   - the low-level search to use, one of LOW_LEVEL_SEARCHES ('A*' or 'SIPP')
+        high_level_heuristic - admissible heuristic of the high-level search, one of HIGH_LEVEL_HEURISTICS ('CG', 'DG'
+                      or 'WDG'), or None to order the nodes by their cost only
         """
 
-        self.my_map = my_map
+        self.my_map = as_grid_map(my_map)
+        self.low_level = low_level
+        self.low_level_search = get_low_level_search(low_level)
+        self.high_level_heuristic = get_high_level_heuristic(high_level_heuristic)
         self.starts = starts
         self.goals = goals
         self.num_of_agents = len(goals)
 
         self.num_of_generated = 0
         self.num_of_expanded = 0
+        self.num_of_bypasses = 0
+        self.num_of_pruned = 0
         self.CPU_time = 0
 
+        self.conflict_avoidance = True  # see find_solution
+
+        # anytime mode, see find_solution
+        self.anytime = False
+        self.incumbent = None  # best solution (paths) found so far
+        self.incumbent_cost = np.inf
+        self.lower_bound = 0  # highest f-value expanded so far, no solution is cheaper
+        self.optimality_gap = np.nan  # (cost - lower_bound) / cost of the returned solution
+
         self.open_list = []
         self.closed_list = []
 
+        # MDDs of the agents, shared by all nodes: (agent, cost, constraints of the agent) -> MDD, at most
+        # MDD_CACHE_SIZE of them in least recently used order
+        self.mdds = OrderedDict()
+
+        # constraint sets of all generated nodes: (constraint hash, meta-agents) -> constraints, see is_duplicate
+        self.generated = dict()
+
         # compute heuristics for the low-level search
         self.heuristics = []
         for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+            self.heuristics.append(get_heuristics(self.my_map, goal))
 
     def push_node(self, node):
-        heapq.heappush(self.open_list, (node['cost'], len(node['collisions']), self.num_of_generated, node))
+        heapq.heappush(self.open_list, (node['cost'] + node['h'], len(node['collisions']), self.num_of_generated, node))
         # print("Generate node {}".format(self.num_of_generated))
         self.num_of_generated += 1
 
+    def get_mdd(self, node, agent) -> MDD:
+        """Returns the MDD of the path of the agent in the node, built once for every set of constraints and cost."""
+        constraints = get_constraints(node['constraints'], agent)
+        key = (agent, len(node['paths'][agent]) - 1, frozenset(constraint_key(constraint) for constraint in constraints))
+
+        mdd = self.mdds.get(key)
+        if mdd is None:
+            mdd = self.mdds[key] = MDD(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent],
+                                       key[1], build_constraint_table(constraints, agent, self.my_map))
+            if len(self.mdds) > MDD_CACHE_SIZE:
+                self.mdds.popitem(last=False)  # evict the least recently used MDD
+        else:
+            self.mdds.move_to_end(key)
+        return mdd
+
+    def choose_collision(self, node) -> dict:
+        """Returns the collision of the node to split on: the first cardinal collision, or else the first
+        semi-cardinal collision, or else the first collision (see classify_collision)."""
+        best_collision, best_class = None, -1
+        for collision in node['collisions']:
+            collision_class = classify_collision(collision, self.get_mdd(node, collision['a1']),
+                                                 self.get_mdd(node, collision['a2']), self.my_map)
+            if collision_class > best_class:
+                best_collision, best_class = collision, collision_class
+                if best_class == CARDINAL:
+                    break
+
+        return best_collision
+
+    def solve_pair(self, node, a1, a2):
+        """Returns the optimal sum of costs of agents a1 and a2 alone under their constraints in the node (used by the
+        WDG heuristic), or None if it is not found within 100 expanded nodes."""
+        agent_map = {a1: 0, a2: 1}
+        constraints = []
+        for constraint in get_constraints(node['constraints']):
+            if constraint['agent'] in agent_map:
+                constraints.append(dict(constraint, agent=agent_map[constraint['agent']]))
+            elif constraint.get('positive', False):  # still constrains both agents, see build_constraint_table
+                constraints.append(dict(constraint, agent=-1))
+
+        solver = CBSSolver(self.my_map, [self.starts[a1], self.starts[a2]], [self.goals[a1], self.goals[a2]],
+                           low_level=self.low_level)
+        result = solver.find_solution(print_results=False, return_costs=True, constraints=constraints, node_limit=100)
+        if len(result[0]) == 0:
+            return None
+        return result[1]
+
+    def get_meta_agent(self, node, agent) -> tuple:
+        """Returns the meta-agent (tuple of agents that are planned jointly) the agent belongs to in the node."""
+        for meta_agent in node['meta_agents']:
+            if agent in meta_agent:
+                return meta_agent
+
+    def is_duplicate(self, node) -> bool:
+        """Returns whether a node with the same constraints (and meta-agents) as the node was generated before, and
+        otherwise records the node. A duplicate has the same solutions below it, so its subtree does not have to be
+        searched again."""
+        key = (node['constraint_hash'], node['meta_agents'])
+        constraints = self.generated.get(key)
+        if constraints is None:
+            self.generated[key] = node['constraints']
+            return False
+
+        # the hashes are equal, make sure the constraints are too
+        return {constraint_key(constraint) for constraint in get_constraints(constraints)} == \
+            {constraint_key(constraint) for constraint in get_constraints(node['constraints'])}
+
+    def replan(self, node, agents):
+        """Replans the paths of the agents in the node under its constraints. Agents of a meta-agent are replanned
+        together with the other agents of their meta-agent by the coupled search (joint_a_star).
+
+        :return set of all replanned agents, or None if no paths are found for one of them
+        """
+        replanned = set()
+        for agent in agents:
+            if agent in replanned:
+                continue
+
+            meta_agent = self.get_meta_agent(node, agent)
+            if len(meta_agent) == 1:
+                conflict_avoidance_table = None
+                if self.conflict_avoidance:
+                    conflict_avoidance_table = ConflictAvoidanceTable(
+                        self.my_map, [path for other, path in enumerate(node['paths']) if other != agent])
+                paths = [self.low_level_search(self.my_map, self.starts[agent], self.goals[agent],
+                                               self.heuristics[agent], agent, get_constraints(node['constraints'], agent),
+                                               conflict_avoidance_table=conflict_avoidance_table)]
+            else:
+                paths = joint_a_star(self.my_map, [self.starts[i] for i in meta_agent],
+                                     [self.goals[i] for i in meta_agent], [self.heuristics[i] for i in meta_agent],
+                                     [build_constraint_table(get_constraints(node['constraints'], i), i, self.my_map)
+                                      for i in meta_agent])
+            self.node_num += 1
+
+            if paths is None or paths[0] is None:
+                return None
+
+            for i, path in zip(meta_agent, paths):
+                node['paths'] = node['paths'][:i] + (tuple(path),) + node['paths'][i + 1:]
+                # only the pairs with the replanned agent can have changed, the rest is inherited from the parent.
+                node['collision_matrix'] = update_collision_matrix(node['collision_matrix'], node['paths'], i)
+            replanned.update(meta_agent)
+
+        return replanned
+
     def pop_node(self):
         _, _, id, node = heapq.heappop(self.open_list)
         # print("Expand node {}".format(id))
         self.num_of_expanded += 1
         return node
 
-    def find_solution(self, disjoint=True, print_results=True, return_costs=False):
+    def find_solution(self, disjoint=False, print_results=True, return_costs=False, prioritize_conflicts=True,
+                      constraints=None, node_limit=None, merge_bound=None, bypass=True, anytime=False, time_limit=300.0,
+                      conflict_avoidance=True):
         """ Finds paths for all agents from their start locations to their goal locations
 
         disjoint    - use disjoint splitting or not
+        prioritize_conflicts - split on cardinal collisions first (see choose_collision) instead of the first collision
+        constraints - constraints of the root node, e.g. to solve a sub-problem of a CBS node
+        node_limit  - stop without a solution after expanding this many nodes, None for no limit
+        merge_bound - MA-CBS: merge two meta-agents into one once they collided more than this many times in the whole
+                      search, instead of splitting on their collision again (up to MAX_META_AGENT_SIZE agents). None
+                      to never merge.
+        bypass      - adopt the paths of a child with the same cost and fewer collisions in the node itself, instead
+                      of branching (see below)
+        anytime     - start with the solution of prioritized planning as incumbent and keep the best solution found.
+                      If the time limit is reached, the incumbent is returned instead of no solution, see
+                      optimality_gap for how far from optimal it may be.
+        time_limit  - process time in seconds after which the search stops
+        conflict_avoidance - let the low-level search prefer, of all shortest paths, the one with the fewest collisions
+                      with the other agents (see ConflictAvoidanceTable)
         """
 
+        if merge_bound is not None and self.high_level_heuristic is not None:
+            raise RuntimeError('The high-level heuristics do not support meta-agents, do not combine them with merging!')
+
         self.start_time = timer.process_time()
+        self.conflict_avoidance = conflict_avoidance
+        rng = random.Random(0)  # agent choice of disjoint splitting, seeded so that runs are reproducible
+        conflict_counts = dict()  # (a1, a2) -> number of times the search split on a collision of the agents
+        failed_merges = set()  # meta-agents for which the coupled search failed, they are split instead
 
         # Generate the root node
-        # constraints   - list of constraints
-        # paths         - list of paths, one for each agent
-        #               [[(x11, y11), (x12, y12), ...], [(x21, y21), (x22, y22), ...], ...]
+        # constraints   - chain of constraints (constraint, parent chain), None for no constraints, see get_constraints
+        # paths         - tuple of paths, one for each agent, shared with the parent except for the replanned agent
+        #               (((x11, y11), (x12, y12), ...), ((x21, y21), (x22, y22), ...), ...)
         # collisions     - list of collisions in paths
+        # collision_matrix - the first collision of every colliding pair of agents, see update_collision_matrix
+        # h             - value of the high-level heuristic, 0 without one
+        # pair_weights  - edge weights of the high-level heuristic computed so far, see compute_heuristic
+        # meta_agents   - tuple of meta-agents, the tuples of agents that are planned jointly (see merge_bound)
+        # constraint_hash - hash of the set of constraints, see add_constraint_hash
 
         root = {'cost': 0,
-                'constraints': [],
-                'paths': [],
-                'collisions': []}
-
-        for i in range(self.num_of_agents):  # Find initial path for each agent
-            path = a_star(self.my_map, self.starts[i], self.goals[i], self.heuristics[i],
-                          i, root['constraints'])
-            if path is None:
-                raise BaseException('No solutions')
-            root['paths'].append(path)
+                'constraints': None,
+                'paths': (),
+                'collisions': [],
+                'collision_matrix': {},
+                'h': 0,
+                'pair_weights': {},
+                'meta_agents': tuple((i,) for i in range(self.num_of_agents)),
+                'constraint_hash': 0}
+
+        for constraint in constraints or []:
+            root['constraints'] = (constraint, root['constraints'])
+            root['constraint_hash'] = add_constraint_hash(root['constraint_hash'], constraint)
+        self.is_duplicate(root)
+
+        conflict_avoidance_table = ConflictAvoidanceTable(self.my_map) if conflict_avoidance else None
+        for i in range(self.num_of_agents):  # Find initial path for each agent, avoiding the ones planned before
+            path = self.low_level_search(self.my_map, self.starts[i], self.goals[i], self.heuristics[i], i,
+                                         get_constraints(root['constraints'], i),
+                                         conflict_avoidance_table=conflict_avoidance_table)
+            if path is None:  # no path at all, or the low-level search ran out of time
+                if return_costs:
+                    return [], np.nan, timer.process_time() - self.start_time
+                else:
+                    return []
+            root['paths'] += (tuple(path),)
+            if conflict_avoidance:
+                conflict_avoidance_table.add_path(path)
 
         root['cost'] = get_sum_of_cost(root['paths'])
-        root['collisions'] = detect_collisions(root['paths'])
+        if self.num_of_agents < VECTORIZE_MIN_PATHS:
+            root['collisions'] = detect_collisions(root['paths'])
+        else:
+            root['collisions'] = detect_collisions_vectorized(root['paths'])
+        root['collision_matrix'] = {(collision['a1'], collision['a2']): collision for collision in root['collisions']}
+        if self.high_level_heuristic is not None:
+            root['h'] = compute_heuristic(self, root, self.high_level_heuristic)
         self.push_node(root)
+        self.lower_bound = root['cost'] + root['h']
 
         self.node_num = 0
 
+        self.anytime = anytime
+        if anytime:
+            solver = PrioritizedPlanningSolver(self.my_map, self.starts, self.goals, low_level=self.low_level)
+            paths, cost, _ = solver.find_solution(print_results=False, return_costs=True)
+            if len(paths) > 0:
+                self.incumbent, self.incumbent_cost = [list(path) for path in paths], cost
+
+        def finish(node, optimal=True):
+            paths = [list(path) for path in node['paths']]
+            cost = get_sum_of_cost(paths)
+            self.lower_bound = cost if optimal else min(self.lower_bound, cost)
+            self.optimality_gap = (cost - self.lower_bound) / cost if cost > 0 else 0.0
+            if print_results:
+                self.print_results(node)
+            if return_costs:
+                return paths, cost, timer.process_time() - self.start_time
+            else:
+                return paths
+
         while len(self.open_list) > 0:
 
             time = timer.process_time()
             run_time = time - self.start_time
-            if run_time >= 300.0:
+            if run_time >= time_limit or (node_limit is not None and self.num_of_expanded >= node_limit):
+                if self.incumbent is not None:
+                    return finish({'paths': self.incumbent}, optimal=False)
                 if return_costs:
                     return [], np.nan, run_time
                 else:
                     return []
 
             parent = self.pop_node()
+            self.lower_bound = max(self.lower_bound, parent['cost'] + parent['h'])
 
-            if len(parent['collisions']) == 0:
-                if print_results:
-                    self.print_results(parent)
-                if return_costs:
-                    return parent['paths'], get_sum_of_cost(parent['paths']), timer.process_time() - self.start_time
-                else:
-                    return parent['paths']
-
-            collision = parent['collisions'][0]
-            constraints = standard_splitting(collision)
+            if self.lower_bound >= self.incumbent_cost:
+                return finish({'paths': self.incumbent})  # no node left can improve on the incumbent, it is optimal
 
+            if len(parent['collisions']) == 0:
+                return finish(parent)
+
+            if prioritize_conflicts:
+                collision = self.choose_collision(parent)
+            else:
+                collision = parent['collisions'][0]
+
+            if merge_bound is not None:
+                pair = (collision['a1'], collision['a2'])
+                conflict_counts[pair] = conflict_counts.get(pair, 0) + 1
+
+                meta_agent1 = self.get_meta_agent(parent, collision['a1'])
+                meta_agent2 = self.get_meta_agent(parent, collision['a2'])
+                meta_agent = tuple(sorted(meta_agent1 + meta_agent2))
+                if len(meta_agent) <= MAX_META_AGENT_SIZE and meta_agent not in failed_merges and \
+                        sum(conflict_counts.get((min(a1, a2), max(a1, a2)), 0)
+                            for a1 in meta_agent1 for a2 in meta_agent2) > merge_bound:
+                    # the node is kept with the merged meta-agent planned jointly, instead of being split
+                    merged = dict(parent, meta_agents=tuple(
+                        other for other in parent['meta_agents'] if other not in (meta_agent1, meta_agent2)
+                    ) + (meta_agent,))
+                    if self.is_duplicate(merged):
+                        self.num_of_pruned += 1
+                        continue
+                    if self.replan(merged, [collision['a1']]) is not None:
+                        merged['cost'] = get_sum_of_cost(merged['paths'])
+                        merged['collisions'] = get_collisions(merged['collision_matrix'])
+                        self.push_node(merged)
+                        continue
+
+                    # the coupled search did not find the paths in time, so the collision is split as usual
+                    failed_merges.add(meta_agent)
+
+            if disjoint:
+                constraints = disjoint_splitting(collision, rng)
+            else:
+                constraints = standard_splitting(collision)
+
+            children = []
             for constraint in constraints:
-                agent = constraint['agent']
+                # A negative constraint only changes the path of its agent. A positive constraint is already met by
+                # the path of its agent, but all other agents that are in the way have to be replanned.
+                if constraint.get('positive', False):
+                    agents = paths_violate_constraint(constraint, parent['paths'])
+                else:
+                    agents = [constraint['agent']]
 
+                # the child shares the constraints and all other paths with its parent, nothing is copied
                 child = {'cost': 0,
-                         'constraints': parent['constraints'] + [constraint],
-                         'paths': deepcopy(parent['paths']),
-                         'collisions': []}
-
-                path = a_star(
-                    self.my_map,
-                    self.starts[agent],
-                    self.goals[agent],
-                    self.heuristics[agent],
-                    agent,
-                    child['constraints']
-                )
-                self.node_num += 1
-
-                if path is None:
+                         'constraints': (constraint, parent['constraints']),
+                         'paths': parent['paths'],
+                         'collisions': [],
+                         'collision_matrix': parent['collision_matrix'],
+                         'h': 0,
+                         'pair_weights': {},
+                         'meta_agents': parent['meta_agents'],
+                         'constraint_hash': add_constraint_hash(parent['constraint_hash'], constraint)}
+
+                # the same constraints may have been reached by adding them in another order
+                if self.is_duplicate(child):
+                    self.num_of_pruned += 1
                     continue
 
-                child['paths'][agent] = deepcopy(path)
-                child['cost'] = get_sum_of_cost(child['paths'])
-                child['collisions'] = deepcopy(detect_collisions(child['paths']))
-
+                replanned = self.replan(child, agents)
+                if replanned is not None:
+                    child['pair_weights'] = {pair: weight for pair, weight in parent['pair_weights'].items()
+                                             if pair[0] not in replanned and pair[1] not in replanned}
+                    child['cost'] = get_sum_of_cost(child['paths'])
+                    child['collisions'] = get_collisions(child['collision_matrix'])
+
+                    # Bypass: the new paths also satisfy the constraints of the parent. If they cost the same and
+                    # collide less, the parent takes them over and is expanded again, without any children.
+                    if bypass and child['cost'] == parent['cost'] and \
+                            len(child['collisions']) < len(parent['collisions']):
+                        children = [dict(child, constraints=parent['constraints'],
+                                         constraint_hash=parent['constraint_hash'])]
+                        self.num_of_bypasses += 1
+                        break
+
+                    children.append(child)
+
+            for child in children:
+                if anytime and len(child['collisions']) == 0 and child['cost'] < self.incumbent_cost:
+                    self.incumbent, self.incumbent_cost = [list(path) for path in child['paths']], child['cost']
+
+                if self.high_level_heuristic is not None:
+                    # the f-value of a child is at least the one of its parent (pathmax)
+                    child['h'] = max(compute_heuristic(self, child, self.high_level_heuristic),
+                                     parent['cost'] + parent['h'] - child['cost'])
                 self.push_node(child)
 
             ##############################
@@ -235,7 +622,13 @@ class CBSSolver(object):
             #                standard_splitting function). Add a new child node to your open list for each constraint
             #           Ensure to create a copy of any objects that your child nodes might inherit
 
-        return root['paths'],
+        # no node is left, e.g. because the low-level search ran out of time for all children
+        if self.incumbent is not None:
+            return finish({'paths': self.incumbent}, optimal=False)
+        if return_costs:
+            return [], np.nan, timer.process_time() - self.start_time
+        else:
+            return []
 
     def print_results(self, node):
         print("\n Found a solution! \n")
@@ -245,3 +638,8 @@ class CBSSolver(object):
         print("Sum of costs:    {}".format(get_sum_of_cost(node['paths'])))
         print("Expanded nodes:  {}".format(self.num_of_expanded))
         print("Generated nodes: {}".format(self.num_of_generated))
+        print("Bypasses:        {}".format(self.num_of_bypasses))
+        print("Pruned nodes:    {}".format(self.num_of_pruned))
+        if self.anytime:
+            print("Lower bound:     {}".format(self.lower_bound))
+            print("Optimality gap:  {:.2%}".format(self.optimality_gap))
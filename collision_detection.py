@@ -0,0 +1,235 @@
+import itertools
+
+import numpy as np
+
+from grid_map import as_grid_map
+from single_agent_planner import get_location
+
+# Below this number of paths the fixed NumPy overhead outweighs the gain, and the pairwise checks (detect_collision and
+# detect_collisions in cbs.py) are faster. The callers pick the implementation with it.
+VECTORIZE_MIN_PATHS = 8
+
+
+def stack_paths(paths: list, columns: int = None) -> np.ndarray:
+    """Stacks paths into a padded (agents x timesteps) array of flat cell indices.
+
+    Paths shorter than the longest path are padded with their last location, since agents wait at their goal after
+    arriving (see get_location).
+
+    :param paths: list of paths, one for each agent
+    :param columns: number of columns of the map, used to compute the flat cell indices (derived from the paths if None)
+
+    :return int64 array of flat cell indices (row * columns + column)
+    """
+    lengths = np.fromiter(map(len, paths), dtype=np.int64, count=len(paths))
+    locations = np.fromiter(itertools.chain.from_iterable(itertools.chain.from_iterable(paths)),
+                            dtype=np.int64, count=2 * int(lengths.sum())).reshape(-1, 2)
+    if columns is None:
+        columns = int(locations[:, 1].max()) + 1
+    cells = locations[:, 0] * columns + locations[:, 1]
+
+    # index of the location of every agent at every timestep in cells, clipped to the last location of its path
+    offsets = np.cumsum(lengths) - lengths
+    timesteps = np.minimum(np.arange(lengths.max())[None, :], lengths[:, None] - 1)
+    return cells[offsets[:, None] + timesteps]
+
+
+def _collision(paths: list, a1: int, a2: int, order: int) -> dict:
+    """Builds the collision dictionary of agents a1 and a2 (as in detect_collisions) from the order of their first
+    collision: 2 * t for a vertex collision at timestep t, 2 * t + 1 for an edge collision between t and t + 1."""
+    time = order // 2
+    if order % 2 == 0:
+        loc = get_location(paths[a1], time)
+    else:
+        loc = [get_location(paths[a1], time), get_location(paths[a1], time + 1)]
+        time += 1
+
+    return {'a1': a1, 'a2': a2, 'loc': loc, 'timestep': time}
+
+
+def detect_collisions_with(path: list, paths: list) -> list:
+    """Returns the first collision of one path with each of the other paths, as detect_collision(path, other) would.
+
+    All other paths are checked at once on the padded path array, which takes O(agents * timesteps) NumPy work.
+
+    :param path: the path to check
+    :param paths: the other paths
+
+    :return list with a (col_loc, col_time) tuple for every path in paths, (None, None) if they do not collide.
+    """
+    if len(paths) == 0:
+        return []
+
+    array = stack_paths([path] + list(paths))
+    own, others = array[0], array[1:]
+    num_paths, length = others.shape
+
+    # events[:, 2t] is a vertex collision at t, events[:, 2t + 1] an edge collision (swap) between t and t + 1.
+    # detect_collision checks in that order, so the first event of each row is the first collision.
+    events = np.zeros((num_paths, 2 * length - 1), dtype=bool)
+    events[:, 0::2] = others == own
+    events[:, 1::2] = (others[:, :-1] == own[1:]) & (others[:, 1:] == own[:-1]) & (own[:-1] != own[1:])
+
+    has_collision = events.any(axis=1)
+    first = events.argmax(axis=1)
+
+    results = []
+    for i in range(num_paths):
+        if not has_collision[i]:
+            results.append((None, None))
+        else:
+            collision = _collision([path], 0, 0, int(first[i]))
+            results.append((collision['loc'], collision['timestep']))
+
+    return results
+
+
+def detect_collisions_vectorized(paths: list) -> list:
+    """Returns the first collision of every pair of colliding agents, the same as detect_collisions in cbs.py.
+
+    Instead of checking every pair of agents, all paths are stacked in one padded array. Vertex collisions are found by
+    sorting all (timestep, cell) occupations, edge collisions by sorting all (timestep, edge) traversals. Only agents
+    sharing a key are compared, so this also scales to solutions with hundreds of agents.
+
+    :param paths: list of paths, one for each agent
+
+    :return list of collision dictionaries ({'a1', 'a2', 'loc', 'timestep'}), ordered by (a1, a2).
+    """
+    if len(paths) < 2:
+        return []
+
+    array = stack_paths(paths)
+    num_agents, length = array.shape
+    num_cells = int(array.max()) + 1
+    agents = np.broadcast_to(np.arange(num_agents)[:, None], array.shape)
+    times = np.broadcast_to(np.arange(length, dtype=np.int64)[None, :], array.shape)
+
+    first = dict()  # (a1, a2) -> order of the first collision, see _collision
+
+    def groups(keys, *values):
+        """Yields the values of all groups of at least two entries with the same key."""
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(keys)]))
+        for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            yield [value[order[start:end]] for value in values]
+
+    def add(a1, a2, order):
+        pair = (min(a1, a2), max(a1, a2))
+        if order < first.get(pair, order + 1):
+            first[pair] = order
+
+    # vertex collisions: two agents in the same cell at the same timestep
+    for group_agents, group_times in groups((times * num_cells + array).ravel(), agents.ravel(), times.ravel()):
+        for a1, a2 in itertools.combinations(group_agents.tolist(), 2):
+            add(a1, a2, 2 * int(group_times[0]))
+
+    # edge collisions: two agents traversing the same edge in opposite directions between the same timesteps
+    if length > 1:
+        from_cells, to_cells = array[:, :-1], array[:, 1:]
+        moving = from_cells != to_cells
+        low, high = np.minimum(from_cells, to_cells), np.maximum(from_cells, to_cells)
+        keys = (times[:, :-1] * num_cells + low) * num_cells + high
+
+        for group_agents, group_times, group_forward in groups(keys[moving], agents[:, :-1][moving],
+                                                               times[:, :-1][moving], (from_cells < to_cells)[moving]):
+            for a1, a2 in itertools.product(group_agents[group_forward].tolist(),
+                                            group_agents[~group_forward].tolist()):
+                add(a1, a2, 2 * int(group_times[0]) + 1)
+
+    return [_collision(paths, a1, a2, first[(a1, a2)]) for a1, a2 in sorted(first)]
+
+
+def detect_collisions_sparse(paths: list) -> list:
+    """Returns the first collision of every pair of colliding agents, the same as detect_collisions in cbs.py.
+
+    All paths are walked once, timestep by timestep, filling a (location, timestep) -> agents occupancy hash and a
+    (from, to, timestep) -> agents edge traversal hash. Agents that reached the end of their path are kept in a
+    location -> agents hash of parked agents instead of being padded. An agent is only compared with the agents in the
+    same entry, so this takes O(agents * timesteps) work no matter how many pairs of agents never come near each other.
+
+    :param paths: list of paths, one for each agent
+
+    :return list of collision dictionaries ({'a1', 'a2', 'loc', 'timestep'}), ordered by (a1, a2).
+    """
+    if len(paths) < 2:
+        return []
+
+    occupancy = dict()  # (location, timestep) -> agents at the location at the timestep
+    traversals = dict()  # (from, to, timestep) -> agents moving from one location to the other after the timestep
+    parked = dict()  # location -> agents that stay at the location (their goal) forever
+    first = dict()  # (a1, a2) -> order of the first collision, see _collision
+
+    def add(a1, a2, order):
+        first.setdefault((min(a1, a2), max(a1, a2)), order)
+
+    # the agents that are still moving at a timestep are always the first num_active agents of this order
+    agents = sorted(range(len(paths)), key=lambda agent: len(paths[agent]), reverse=True)
+    num_active = len(agents)
+
+    for time in range(len(paths[agents[0]])):
+        while len(paths[agents[num_active - 1]]) <= time:
+            num_active -= 1
+            parked.setdefault(paths[agents[num_active]][-1], []).append(agents[num_active])
+        active = agents[:num_active]
+
+        # vertex collisions at time come before edge collisions between time and time + 1 (see detect_collision)
+        for agent in active:
+            loc = paths[agent][time]
+            others = occupancy.setdefault((loc, time), [])
+            for other in others + parked.get(loc, []):
+                add(agent, other, 2 * time)
+            others.append(agent)
+
+        for agent in active:
+            path = paths[agent]
+            if time + 1 == len(path) or path[time] == path[time + 1]:
+                continue  # parked agents and waiting agents cannot swap locations with another agent
+            for other in traversals.get((path[time + 1], path[time], time), []):
+                add(agent, other, 2 * time + 1)
+            traversals.setdefault((path[time], path[time + 1], time), []).append(agent)
+
+    return [_collision(paths, a1, a2, first[(a1, a2)]) for a1, a2 in sorted(first)]
+
+
+def validate_solution(my_map, starts: list, goals: list, paths: list) -> list:
+    """Checks a solution: every path must start at its start and end at its goal location, only wait or move to a free
+    neighboring cell, and no two agents may collide (checked with detect_collisions_sparse).
+
+    :param my_map: the map (GridMap or list of lists)
+    :param starts: list of start locations
+    :param goals: list of goal locations
+    :param paths: list of paths, one for each agent
+
+    :return list of problems found (as strings), empty if the solution is valid.
+    """
+    grid = as_grid_map(my_map)
+    problems = []
+
+    if len(paths) != len(starts):
+        return [f'{len(paths)} paths for {len(starts)} agents']
+
+    for agent, path in enumerate(paths):
+        if tuple(path[0]) != tuple(starts[agent]):
+            problems.append(f'agent {agent} starts at {path[0]} instead of {starts[agent]}')
+        if tuple(path[-1]) != tuple(goals[agent]):
+            problems.append(f'agent {agent} ends at {path[-1]} instead of {goals[agent]}')
+        if not all(grid.is_free(loc) for loc in path):
+            problems.append(f'agent {agent} visits an obstacle or leaves the map')
+    if problems:
+        return problems
+
+    array = stack_paths(paths, grid.columns)
+    from_cells, to_cells = array[:, :-1], array[:, 1:]
+    valid_moves = (from_cells == to_cells) | (grid.neighbor_table[from_cells] == to_cells[..., None]).any(axis=-1)
+    for agent, time in zip(*np.nonzero(~valid_moves)):
+        problems.append(f'agent {agent} makes an invalid move at timestep {time + 1}')
+
+    # a different detector than the solvers use, so the check does not share their code
+    for collision in detect_collisions_sparse(paths):
+        problems.append(f'agents {collision["a1"]} and {collision["a2"]} collide at {collision["loc"]} at timestep '
+                        f'{collision["timestep"]}')
+
+    return problems
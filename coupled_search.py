@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import time as timer
+
+from grid_map import as_grid_map
+from single_agent_planner import UNREACHABLE
+
+# The joint state space grows exponentially with the number of agents, larger meta-agents are not formed (see CBSSolver)
+MAX_META_AGENT_SIZE = 3
+
+
+class JointNode(object):
+    """Node of the coupled search: the cells of all agents of a meta-agent at one timestep."""
+
+    __slots__ = ('cells', 'time', 'costs', 'g_val', 'h_val', 'parent')
+
+    def __init__(self, cells: tuple, time: int, costs: tuple, h_val: int, parent):
+        """
+        :param cells: flat cell index of every agent
+        :param time: timestep of the node
+        :param costs: cost of every agent so far: the time it arrived at its goal if it is there, otherwise time
+        :param h_val: sum of the heuristic values of the agents
+        :param parent: parent JointNode, None for the root node
+        """
+        self.cells = cells
+        self.time = time
+        self.costs = costs
+        self.g_val = sum(costs)
+        self.h_val = h_val
+        self.parent = parent
+
+
+def dominates(costs: tuple, other_costs: tuple) -> bool:
+    """Returns whether costs are at most other_costs for every agent and lower for at least one."""
+    return costs != other_costs and all(cost <= other for cost, other in zip(costs, other_costs))
+
+
+def get_joint_paths(goal_node, grid) -> list:
+    """Builds the path of every agent, each ending when the agent arrives at its goal for the last time."""
+    nodes = []
+    curr = goal_node
+    while curr is not None:
+        nodes.append(curr)
+        curr = curr.parent
+    nodes.reverse()
+
+    return [[grid.locations[node.cells[i]] for node in nodes[:cost + 1]] for i, cost in enumerate(goal_node.costs)]
+
+
+def joint_a_star(my_map, start_locs, goal_locs, h_values, constraint_tables):
+    """ Coupled A* for a meta-agent: plans the paths of all its agents at once in the joint state space, so that they
+    never collide with each other. Finds the paths with the lowest sum of costs that satisfy the constraints of every
+    agent (constraints from outside the meta-agent).
+
+        my_map      - binary obstacle map (GridMap or list of lists)
+        start_locs  - start position of every agent
+        goal_locs   - goal position of every agent
+        h_values    - heuristic table of the goal of every agent, see compute_heuristics
+        constraint_tables - ConstraintTable of every agent, see build_constraint_table
+
+        :return list with the path of every agent, or None if no paths are found
+    """
+
+    grid = as_grid_map(my_map)
+    num_agents = len(start_locs)
+    start_cells = tuple(int(grid.index(loc)) for loc in start_locs)
+    goal_cells = tuple(int(grid.index(loc)) for loc in goal_locs)
+
+    h_value = sum(h.item(cell) for h, cell in zip(h_values, start_cells))
+    if any(h.item(cell) == UNREACHABLE for h, cell in zip(h_values, start_cells)):
+        return None
+
+    # see a_star: after the last constraint of any agent, only the cells of a state matter
+    time_horizon = max(constraint_table.horizon for constraint_table in constraint_tables) + 1
+
+    root = JointNode(start_cells, 0, tuple(0 for _ in range(num_agents)), h_value, None)
+    open_list = [(root.g_val + root.h_val, root.h_val, 0, root)]
+    # closed_list maps every generated state (cells, min(time, time_horizon)) to the costs of the nodes generated in it.
+    # Nodes in the same state only differ in the arrival times of the agents at their goal, and an earlier arrival is
+    # only better if the agent stays there. So a node is only discarded if another one is as good for every agent.
+    closed_list = {(start_cells, 0): [root.costs]}
+    num_generated = 0
+
+    neighbors = grid.neighbors
+    start_time = timer.process_time()
+
+    while len(open_list) > 0 and timer.process_time() - start_time < 1.0:
+        _, _, _, curr = heapq.heappop(open_list)
+
+        if any(dominates(costs, curr.costs) for costs in closed_list[(curr.cells, min(curr.time, time_horizon))]):
+            continue  # a better node in this state was found after this node was pushed
+
+        if curr.cells == goal_cells and not any(constraint_table.goal_constrained(goal_cell, curr.time)
+                                                for constraint_table, goal_cell in zip(constraint_tables, goal_cells)):
+            return get_joint_paths(curr, grid)
+
+        child_time = curr.time + 1
+
+        # the allowed moves of every agent on its own, then all combinations that do not collide with each other
+        moves = []
+        for i, cell in enumerate(curr.cells):
+            moves.append([next_cell for next_cell in neighbors[cell] + (cell,)
+                          if not constraint_tables[i].is_constrained(cell, next_cell, child_time)])
+
+        for child_cells in itertools.product(*moves):
+            if len(set(child_cells)) < num_agents:
+                continue  # vertex collision
+            if any(child_cells[i] == curr.cells[j] and child_cells[j] == curr.cells[i]
+                   for i, j in itertools.combinations(range(num_agents), 2)):
+                continue  # edge collision
+
+            costs = tuple(cost if child_cell == cell == goal_cell else child_time
+                          for cost, cell, child_cell, goal_cell in zip(curr.costs, curr.cells, child_cells, goal_cells))
+            h_val = sum(h.item(cell) for h, cell in zip(h_values, child_cells))
+
+            generated = closed_list.setdefault((child_cells, min(child_time, time_horizon)), [])
+            if any(costs == other or dominates(other, costs) for other in generated):
+                continue
+
+            child = JointNode(child_cells, child_time, costs, h_val, curr)
+            generated.append(costs)
+            num_generated += 1
+            heapq.heappush(open_list, (child.g_val + child.h_val, child.h_val, num_generated, child))
+
+    return None  # Failed to find solutions
@@ -2,28 +2,39 @@ import time as timer
 from scipy.spatial import distance
 import numpy as np
 
-from single_agent_planner import compute_heuristics, get_sum_of_cost
+from single_agent_planner import get_sum_of_cost, ConflictAvoidanceTable
 from distributed_agent import AgentDistributed
+from grid_map import as_grid_map
+from heuristic_cache import get_heuristics
 
 
 class DistributedPlanningSolver(object):
     """A distributed planner"""
 
-    def __init__(self, my_map, starts, goals):
-        """my_map   - list of lists specifying obstacle positions
+    def __init__(self, my_map, starts, goals, low_level='A*'):
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        low_level   - the low-level search the agents use, one of LOW_LEVEL_SEARCHES ('A*' or 'SIPP')
         """
         self.dist_threshold = 4  # the radius of any agent's local radar (in cell lengths)
 
-        self.my_map = my_map
-
-        self.map = my_map
-        self.agents = [AgentDistributed(start=start,
-                                        goal=goal,
-                                        heuristics=compute_heuristics(my_map=my_map, goal=goal),
-                                        my_map=my_map
-                                        ) for start, goal in zip(starts, goals)]
+        self.my_map = as_grid_map(my_map)
+
+        self.map = self.my_map
+        self.agents = []
+        for start, goal in zip(starts, goals):
+            # the initial plan avoids the plans of the agents already on the local radar, where that costs nothing
+            conflict_avoidance_table = ConflictAvoidanceTable(
+                self.my_map, [agent.plan for agent in self.agents
+                              if distance.euclidean(agent.location, start) <= self.dist_threshold])
+
+            self.agents.append(AgentDistributed(start=start,
+                                                goal=goal,
+                                                heuristics=get_heuristics(my_map=self.my_map, goal=goal),
+                                                my_map=self.my_map,
+                                                low_level=low_level,
+                                                conflict_avoidance_table=conflict_avoidance_table))
 
         self.solved = False
 
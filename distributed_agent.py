@@ -1,20 +1,25 @@
-from single_agent_planner import a_star
+from low_level import get_low_level_search
 from cbs import detect_collision, get_location
+from collision_detection import detect_collisions_with, VECTORIZE_MIN_PATHS
 
 # TODO : prepend curr loc to plan
 
 class AgentDistributed(object):
     """Aircraft object to be used in the distributed planner."""
 
-    def __init__(self, my_map, start, goal, heuristics):
+    def __init__(self, my_map, start, goal, heuristics, low_level='A*', conflict_avoidance_table=None):
         """
-        my_map   - list of lists specifying obstacle positions
+        my_map   - GridMap specifying obstacle positions
         starts      - (x1, y1) start location
         goals       - (x1, y1) goal location
         heuristics  - heuristic to goal location
+        low_level   - the low-level search to use, one of LOW_LEVEL_SEARCHES ('A*' or 'SIPP')
+        conflict_avoidance_table - ConflictAvoidanceTable of the plans of other agents that the initial plan avoids
+                      where that costs nothing
         """
 
         self.my_map = my_map
+        self.low_level_search = get_low_level_search(low_level)
         self.location = start
         self.goal = goal
         self.heuristics = heuristics
@@ -22,7 +27,7 @@ class AgentDistributed(object):
         self.path_history = [start]
         self.neighbors = []
 
-        self.plan = self.__a_star()
+        self.plan = self.__a_star(conflict_avoidance_table=conflict_avoidance_table)
         self.planned_cost = len(self.plan)
 
     def time_step(self):
@@ -44,15 +49,29 @@ class AgentDistributed(object):
 
     def update_plan(self):
         """" Updates plan: if a future conflict is detected with any of the neighbors, resolve it."""
-        for n in self.neighbors:
-            (col_loc, col_time) = self.__detect_collision(n)
+        neighbors = self.neighbors
+        while len(neighbors) > 0:
+            n = self.__first_colliding_neighbor(neighbors)
+            if n is None:
+                break
+            self.__resolve_conflict(n)
+
+            # resolving may have changed the own plan, so the remaining neighbors are checked again
+            neighbors = neighbors[neighbors.index(n) + 1:]
+
+    def __first_colliding_neighbor(self, neighbors):
+        """" Detects future collisions between the own plan and the plans of the neighbors (all at once for many
+        neighbors), returns the first neighbor (in order) with a collision or None. """
+
+        if len(neighbors) < VECTORIZE_MIN_PATHS:
+            collisions = [detect_collision(self.plan, n.plan) for n in neighbors]
+        else:
+            collisions = detect_collisions_with(self.plan, [n.plan for n in neighbors])
+        for n, (col_loc, col_time) in zip(neighbors, collisions):
             if col_loc is not None:
-                self.__resolve_conflict(n)
-        
-    def __detect_collision(self, n) -> tuple:
-        """" Detects future collision between two agents plans """
+                return n
 
-        return detect_collision(self.plan, n.plan)
+        return None
 
     def __resolve_conflict(self, n):
         other_agents = (set(n.neighbors) | set(self.neighbors)) - {self} - {n}
@@ -124,11 +143,12 @@ class AgentDistributed(object):
 
         return constraints
 
-    def __a_star(self, constraints=None):
-        """"Performs A* to create the plan for an agent. """
+    def __a_star(self, constraints=None, conflict_avoidance_table=None):
+        """"Performs the low-level search (A* or SIPP) to create the plan for an agent. """
         if constraints is None:
             constraints = []
 
-        return a_star(self.my_map, self.location, self.goal, self.heuristics, self, constraints=constraints)
+        return self.low_level_search(self.my_map, self.location, self.goal, self.heuristics, self,
+                                     constraints=constraints, conflict_avoidance_table=conflict_avoidance_table)
 
 
@@ -0,0 +1,293 @@
+import time as timer
+import heapq
+import random
+
+import numpy as np
+
+from single_agent_planner import build_constraint_table, get_path, get_sum_of_cost, Node, ConflictAvoidanceTable, \
+    UNREACHABLE
+from collision_detection import detect_collisions_vectorized, VECTORIZE_MIN_PATHS
+from cbs import CBSSolver, detect_collisions, get_collisions, get_constraints, update_collision_matrix, \
+    standard_splitting, disjoint_splitting, paths_violate_constraint
+from grid_map import as_grid_map
+
+
+class FocalNode(Node):
+    """Node of the focal search, also recording whether it has been expanded."""
+
+    __slots__ = ('closed',)
+
+    def __init__(self, cell: int, time: int, g_val: int, h_val: int, parent, conflicts: int):
+        super().__init__(cell, time, g_val, h_val, parent, conflicts)
+        self.closed = False
+
+
+def focal_a_star(my_map, start_loc, goal_loc, h_values, agent, constraints, w, conflict_avoidance_table,
+                 constraint_table=None):
+    """ Bounded suboptimal focal search: like a_star, but expands from the focal list of all open nodes with an f-value
+    of at most w times the lowest f-value in the open list, the node with the fewest collisions with the other agents
+    (see ConflictAvoidanceTable) first.
+
+        my_map      - binary obstacle map (GridMap or list of lists)
+        start_loc   - start position
+        goal_loc    - goal position
+        h_values    - heuristic table of the goal location, see compute_heuristics
+        agent       - the agent that is being re-planned
+        constraints - constraints defining where robot should or cannot go at each time step
+        w           - suboptimality factor (at least 1)
+        conflict_avoidance_table - the ConflictAvoidanceTable of the paths of the other agents
+        constraint_table - prebuilt constraint table used instead of the constraints
+
+        :return (path, lower bound): the path found and the lowest f-value in the open list when it was found, a lower
+        bound of the optimal path cost. (None, None) if no path is found.
+    """
+
+    grid = as_grid_map(my_map)
+    if constraint_table is None:
+        constraint_table = build_constraint_table(constraints=constraints, agent=agent, my_map=grid)
+
+    start_cell = int(grid.index(start_loc))
+    goal_cell = int(grid.index(goal_loc))
+    h_value = h_values.item(start_cell)
+    if h_value == UNREACHABLE:
+        return None, None
+
+    # the collisions also change until the last other agent arrived at its goal, see a_star
+    time_horizon = max(constraint_table.horizon, conflict_avoidance_table.horizon) + 1
+
+    open_list = []  # (f, h, tie, node) of all generated nodes that were not expanded yet, to find the lowest f-value
+    waiting_list = []  # (f, h, tie, node) of the open nodes that are not in the focal list (yet)
+    focal_list = []  # (conflicts, f, h, tie, node)
+    # closed_list maps every generated state (cell, min(time, time_horizon)) to the (g-value, conflicts) of the nodes
+    # generated in it. A new node is only discarded if an earlier one is at least as good in both.
+    closed_list = {(start_cell, 0): [(0, 0)]}
+    num_generated = 0
+
+    def push(node):
+        entry = (node.g_val + node.h_val, node.h_val, num_generated, node)
+        heapq.heappush(open_list, entry)
+        if entry[0] <= w * f_min:
+            heapq.heappush(focal_list, (node.conflicts,) + entry)
+        else:
+            heapq.heappush(waiting_list, entry)
+
+    f_min = h_value
+    push(FocalNode(start_cell, 0, 0, h_value, None, 0))
+
+    neighbors = grid.neighbors
+    start_time = timer.process_time()
+
+    while len(focal_list) > 0 and timer.process_time() - start_time < 1.0:
+        curr = heapq.heappop(focal_list)[-1]
+        curr.closed = True
+
+        if curr.cell == goal_cell and not constraint_table.goal_constrained(goal_cell, curr.time):
+            return get_path(curr, grid), f_min
+
+        child_time = curr.time + 1
+        child_g_val = curr.g_val + 1
+
+        for child_cell in neighbors[curr.cell] + (curr.cell,):
+            if constraint_table.is_constrained(curr.cell, child_cell, child_time):
+                continue
+
+            conflicts = curr.conflicts + conflict_avoidance_table.conflicts(curr.cell, child_cell, child_time)
+            generated = closed_list.setdefault((child_cell, min(child_time, time_horizon)), [])
+            if any(g_val <= child_g_val and other <= conflicts for g_val, other in generated):
+                continue
+
+            generated.append((child_g_val, conflicts))
+            num_generated += 1
+            push(FocalNode(child_cell, child_time, child_g_val, h_values.item(child_cell), curr, conflicts))
+
+        # the lowest f-value can only grow, then more nodes fit into the focal list
+        while len(open_list) > 0 and open_list[0][-1].closed:
+            heapq.heappop(open_list)
+        if len(open_list) > 0 and open_list[0][0] > f_min:
+            f_min = open_list[0][0]
+            while len(waiting_list) > 0 and waiting_list[0][0] <= w * f_min:
+                entry = heapq.heappop(waiting_list)
+                heapq.heappush(focal_list, (entry[-1].conflicts,) + entry)
+
+    return None, None  # Failed to find solutions
+
+
+class ECBSSolver(CBSSolver):
+    """Enhanced CBS: a bounded suboptimal CBS that finds a solution with a sum of costs of at most w times the optimal
+    sum of costs. Both the high-level and the low-level search (focal_a_star) use a focal list to prefer nodes with
+    fewer collisions among the nodes within the bound."""
+
+    def __init__(self, my_map, starts, goals, w=1.5):
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
+        starts      - [(x1, y1), (x2, y2), ...] list of start locations
+        goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        w           - suboptimality factor (at least 1)
+        """
+        super().__init__(my_map, starts, goals)
+        if w < 1:
+            raise RuntimeError(f'The suboptimality factor w must be at least 1, not {w}!')
+        self.w = w
+
+        self.focal_list = []
+        self.waiting_list = []
+
+        self.lower_bound = 0  # lowest lower bound of the nodes in the open list, see find_solution
+
+    def plan_path(self, node, agent):
+        """Plans the path of the agent in the node with the focal search, avoiding the paths of the other agents.
+
+        :return (path, lower bound), see focal_a_star
+        """
+        conflict_avoidance_table = ConflictAvoidanceTable(
+            self.my_map, [path for other, path in enumerate(node['paths']) if other != agent])
+
+        return focal_a_star(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent], agent,
+                            get_constraints(node['constraints'], agent), self.w, conflict_avoidance_table)
+
+    def push_node(self, node):
+        # open: ordered by lower bound, focal: the nodes within the bound, ordered by number of collisions
+        entry = (node['lower_bound'], node['cost'], self.num_of_generated, node)
+        heapq.heappush(self.open_list, entry)
+        if node['cost'] <= self.w * self.lower_bound:
+            heapq.heappush(self.focal_list, (len(node['collisions']), node['cost'], self.num_of_generated, node))
+        else:
+            heapq.heappush(self.waiting_list, (node['cost'], self.num_of_generated, node))
+        self.num_of_generated += 1
+
+    def pop_node(self):
+        _, _, id, node = heapq.heappop(self.focal_list)
+        node['closed'] = True
+        self.num_of_expanded += 1
+        return node
+
+    def update_lower_bound(self):
+        """Updates the lowest lower bound of the open list and moves the nodes that are now within the bound from the
+        waiting list into the focal list."""
+        while len(self.open_list) > 0 and self.open_list[0][-1]['closed']:
+            heapq.heappop(self.open_list)
+        if len(self.open_list) == 0:
+            return
+
+        self.lower_bound = max(self.lower_bound, self.open_list[0][0])
+        while len(self.waiting_list) > 0 and self.waiting_list[0][0] <= self.w * self.lower_bound:
+            cost, id, node = heapq.heappop(self.waiting_list)
+            heapq.heappush(self.focal_list, (len(node['collisions']), cost, id, node))
+
+    def find_solution(self, disjoint=False, print_results=True, return_costs=False, time_limit=300.0):
+        """ Finds paths for all agents from their start locations to their goal locations, with a sum of costs of at
+        most w times lower_bound, which is at most the optimal sum of costs. The relative difference of the sum of costs
+        and lower_bound is stored in optimality_gap.
+
+        disjoint    - use disjoint splitting or not
+        time_limit  - process time in seconds after which the search stops
+        """
+
+        self.start_time = timer.process_time()
+        rng = random.Random(0)  # agent choice of disjoint splitting, seeded so that runs are reproducible
+
+        # The nodes are the same as in CBSSolver.find_solution, with:
+        # lower_bounds  - tuple of the lower bounds of the paths found by focal_a_star
+        # lower_bound   - sum of lower_bounds, a lower bound of the sum of costs of any solution below this node
+        # closed        - whether the node has been expanded
+
+        root = {'cost': 0,
+                'lower_bound': 0,
+                'constraints': None,
+                'paths': (),
+                'lower_bounds': (),
+                'collisions': [],
+                'collision_matrix': {},
+                'closed': False}
+
+        for i in range(self.num_of_agents):  # Find initial path for each agent, avoiding the ones planned before
+            path, lower_bound = self.plan_path(root, i)
+            if path is None:  # no path at all, or the low-level search ran out of time
+                if return_costs:
+                    return [], np.nan, timer.process_time() - self.start_time
+                else:
+                    return []
+            root['paths'] += (tuple(path),)
+            root['lower_bounds'] += (lower_bound,)
+
+        root['cost'] = get_sum_of_cost(root['paths'])
+        root['lower_bound'] = sum(root['lower_bounds'])
+        if self.num_of_agents < VECTORIZE_MIN_PATHS:
+            root['collisions'] = detect_collisions(root['paths'])
+        else:
+            root['collisions'] = detect_collisions_vectorized(root['paths'])
+        root['collision_matrix'] = {(collision['a1'], collision['a2']): collision for collision in root['collisions']}
+        self.lower_bound = root['lower_bound']
+        self.push_node(root)
+
+        while len(self.focal_list) > 0:
+
+            run_time = timer.process_time() - self.start_time
+            if run_time >= time_limit:
+                if return_costs:
+                    return [], np.nan, run_time
+                else:
+                    return []
+
+            parent = self.pop_node()
+
+            if len(parent['collisions']) == 0:
+                paths = [list(path) for path in parent['paths']]
+                cost = get_sum_of_cost(paths)
+                self.optimality_gap = (cost - self.lower_bound) / cost if cost > 0 else 0.0
+                if print_results:
+                    self.print_results(parent)
+                if return_costs:
+                    return paths, cost, timer.process_time() - self.start_time
+                else:
+                    return paths
+
+            collision = parent['collisions'][0]
+            if disjoint:
+                constraints = disjoint_splitting(collision, rng)
+            else:
+                constraints = standard_splitting(collision)
+
+            for constraint in constraints:
+                if constraint.get('positive', False):
+                    agents = paths_violate_constraint(constraint, parent['paths'])
+                else:
+                    agents = [constraint['agent']]
+
+                child = {'cost': 0,
+                         'lower_bound': 0,
+                         'constraints': (constraint, parent['constraints']),
+                         'paths': parent['paths'],
+                         'lower_bounds': parent['lower_bounds'],
+                         'collisions': [],
+                         'collision_matrix': parent['collision_matrix'],
+                         'closed': False}
+
+                for agent in agents:
+                    path, lower_bound = self.plan_path(child, agent)
+                    if path is None:
+                        break
+
+                    child['paths'] = child['paths'][:agent] + (tuple(path),) + child['paths'][agent + 1:]
+                    # the lower bound of the parent still holds, the child only has more constraints
+                    lower_bound = max(lower_bound, parent['lower_bounds'][agent])
+                    child['lower_bounds'] = (child['lower_bounds'][:agent] + (lower_bound,) +
+                                             child['lower_bounds'][agent + 1:])
+                    child['collision_matrix'] = update_collision_matrix(child['collision_matrix'], child['paths'],
+                                                                        agent)
+                else:
+                    child['cost'] = get_sum_of_cost(child['paths'])
+                    child['lower_bound'] = sum(child['lower_bounds'])
+                    child['collisions'] = get_collisions(child['collision_matrix'])
+                    self.push_node(child)
+
+            self.update_lower_bound()
+
+        if return_costs:
+            return [], np.nan, timer.process_time() - self.start_time
+        return []
+
+    def print_results(self, node):
+        super().print_results(node)
+        print("Lower bound:     {}".format(self.lower_bound))
+        print("Cost / bound:    {:.3f} (w = {})".format(node['cost'] / max(self.lower_bound, 1), self.w))
+        print("Optimality gap:  {:.2%}".format(self.optimality_gap))
@@ -0,0 +1,106 @@
+import hashlib
+
+import numpy as np
+
+# Same direction order as single_agent_planner.move: left, down, right, up ((row, column) offsets).
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+
+
+class GridMap(object):
+    """Array backed 4-connected grid map shared by all planners.
+
+    Cells are addressed either by their (row, column) location tuple or by their flat cell index
+    (row * columns + column). The occupancy is stored as a NumPy boolean array and the free neighbors of every cell are
+    precomputed once, so the searches never have to bounds check a move.
+
+    For backwards compatibility the object also behaves like the old list of lists of booleans: my_map[row][column],
+    len(my_map), len(my_map[0]) and np.array(my_map) all still work.
+    """
+
+    def __init__(self, occupancy, neighbor_table=None):
+        """
+        :param occupancy: 2D array-like of booleans (or a GridMap), True indicates an obstacle.
+        :param neighbor_table: precomputed neighbor table of this occupancy (e.g. a view on shared memory), it is
+        computed if not given. Boolean arrays and the given neighbor table are used without copying them.
+        """
+        if isinstance(occupancy, GridMap):
+            occupancy = occupancy.occupancy
+
+        self.occupancy = np.asarray(occupancy, dtype=bool)
+        self.occupancy.flags.writeable = False
+        self.rows, self.columns = self.occupancy.shape
+        self.num_cells = self.rows * self.columns
+
+        # content hash of the map, identifies the map in caches independent of the object (or process) holding it
+        self.fingerprint = hashlib.sha1(
+            f'{self.rows}x{self.columns}:'.encode() + np.packbits(self.occupancy).tobytes()
+        ).hexdigest()
+
+        # location tuple of every flat cell index, used to decode cell indices in the searches
+        self.locations = [(row, column) for row in range(self.rows) for column in range(self.columns)]
+
+        # neighbor_table[cell, dir] is the flat index of the cell reached by moving in direction dir, or -1 if that move
+        # leaves the map or ends on an obstacle.
+        if neighbor_table is None:
+            neighbor_table = self._compute_neighbor_table()
+        self.neighbor_table = neighbor_table
+        self.neighbor_table.flags.writeable = False
+
+        # python version of the neighbor table (tuples of free neighbor cells), which is faster to iterate in the
+        # pure python searches than indexing into the NumPy array.
+        self.neighbors = [tuple(int(cell) for cell in row if cell >= 0) for row in self.neighbor_table]
+        self._neighbor_locations = [tuple(self.locations[cell] for cell in cells) for cells in self.neighbors]
+
+    def _compute_neighbor_table(self) -> np.ndarray:
+        rows, columns = np.indices(self.occupancy.shape)
+        neighbor_table = np.full((self.num_cells, len(DIRECTIONS)), -1, dtype=np.int32)
+        for dir, (d_row, d_column) in enumerate(DIRECTIONS):
+            next_rows = rows + d_row
+            next_columns = columns + d_column
+            valid = (next_rows >= 0) & (next_rows < self.rows) & (next_columns >= 0) & (next_columns < self.columns)
+            valid[valid] = ~self.occupancy[next_rows[valid], next_columns[valid]]
+            neighbor_table[:, dir][valid.ravel()] = (next_rows * self.columns + next_columns)[valid]
+        neighbor_table[self.occupancy.ravel()] = -1  # obstacles have no outgoing moves
+        return neighbor_table
+
+    def index(self, loc) -> int:
+        """Returns the flat cell index of a (row, column) location."""
+        return loc[0] * self.columns + loc[1]
+
+    def location(self, cell: int) -> tuple:
+        """Returns the (row, column) location of a flat cell index."""
+        return self.locations[cell]
+
+    def is_free(self, loc) -> bool:
+        """Returns whether a (row, column) location is inside the map and not an obstacle."""
+        return 0 <= loc[0] < self.rows and 0 <= loc[1] < self.columns and not self.occupancy[loc[0], loc[1]]
+
+    def neighbor_locations(self, loc) -> tuple:
+        """Returns the free 4-connected neighbor locations of a (row, column) location."""
+        return self._neighbor_locations[loc[0] * self.columns + loc[1]]
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        return self.occupancy[row]
+
+    def __iter__(self):
+        return iter(self.occupancy)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.occupancy if dtype is None else self.occupancy.astype(dtype)
+
+    def __getstate__(self):
+        # Only the occupancy is pickled (e.g. when sending the map to worker processes), the tables are rebuilt.
+        return {'occupancy': self.occupancy}
+
+    def __setstate__(self, state):
+        self.__init__(state['occupancy'])
+
+
+def as_grid_map(my_map) -> GridMap:
+    """Returns my_map as a GridMap, so solvers accept both a GridMap and the old list of lists of booleans."""
+    if isinstance(my_map, GridMap):
+        return my_map
+    return GridMap(my_map)
@@ -0,0 +1,129 @@
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from grid_map import as_grid_map
+from single_agent_planner import compute_heuristics
+
+
+class HeuristicCache(object):
+    """Cache of heuristic tables (see compute_heuristics), keyed by map fingerprint and goal cell.
+
+    The tables are kept in a bounded least recently used cache in memory. If a directory is set, tables are also stored
+    on disk as <directory>/<map fingerprint>/<row>_<column>.npy, so other processes (e.g. orchestrator workers) only
+    have to load them instead of computing them again.
+
+    The returned tables are shared between all solvers and therefore read-only.
+    """
+
+    def __init__(self, max_size=256, directory=None):
+        """
+        :param max_size: maximum number of heuristic tables kept in memory
+        :param directory: directory of the on-disk store, or None to only cache in memory
+        """
+        self.max_size = max_size
+        self.directory = directory
+
+        self.hits = 0
+        self.misses = 0
+
+        self._tables = OrderedDict()
+        self._pinned = {}  # tables that are never evicted, e.g. views on shared memory (see shared_tables.py)
+
+    def get(self, my_map, goal) -> np.ndarray:
+        """Returns the heuristic table of the goal location, computing (and storing) it if it is not cached yet."""
+        grid = as_grid_map(my_map)
+        key = (grid.fingerprint, (int(goal[0]), int(goal[1])))
+
+        table = self._pinned.get(key)
+        if table is not None:
+            self.hits += 1
+            return table
+
+        table = self._tables.get(key)
+        if table is not None:
+            self._tables.move_to_end(key)
+            self.hits += 1
+            return table
+
+        self.misses += 1
+        table = self._load(key)
+        if table is None:
+            table = compute_heuristics(grid, goal)
+            self._store(key, table)
+
+        table.flags.writeable = False
+        self._insert(key, table)
+        return table
+
+    def warm(self, my_map, goals):
+        """Makes sure the heuristic tables of all goals are cached (and on disk if a directory is set)."""
+        for goal in goals:
+            self.get(my_map, goal)
+
+    def add(self, my_map, goal, table, pin=False):
+        """Adds an externally computed heuristic table of the goal location to the cache.
+
+        :param pin: if True, the table is never evicted from the cache
+        """
+        grid = as_grid_map(my_map)
+        key = (grid.fingerprint, (int(goal[0]), int(goal[1])))
+        table.flags.writeable = False
+        if pin:
+            self._pinned[key] = table
+        else:
+            self._insert(key, table)
+
+    def clear(self):
+        """Empties the in-memory cache (the on-disk store is kept)."""
+        self._tables.clear()
+        self._pinned.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._tables) + len(self._pinned)
+
+    def _insert(self, key, table):
+        self._tables[key] = table
+        self._tables.move_to_end(key)
+        while len(self._tables) > self.max_size:
+            self._tables.popitem(last=False)  # evict the least recently used table
+
+    def _file_name(self, key) -> str:
+        fingerprint, goal = key
+        return os.path.join(self.directory, fingerprint, f'{goal[0]}_{goal[1]}.npy')
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+
+        try:
+            return np.load(self._file_name(key))
+        except (OSError, ValueError):  # not stored yet (or unreadable), so it is computed again
+            return None
+
+    def _store(self, key, table):
+        if self.directory is None:
+            return
+
+        file_name = self._file_name(key)
+        try:
+            os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+            # write to a temporary file first so that other processes never load a half written table
+            with open(f'{file_name}.{os.getpid()}.new', 'wb') as f:
+                np.save(f, table)
+            os.replace(f'{file_name}.{os.getpid()}.new', file_name)
+        except OSError as x:
+            print(f'Could not store heuristic table on disk due to: {x}')
+
+
+# Process wide cache used by all solvers.
+heuristic_cache = HeuristicCache()
+
+
+def get_heuristics(my_map, goal) -> np.ndarray:
+    """Returns the (cached) heuristic table of the goal location on the map, see compute_heuristics."""
+    return heuristic_cache.get(my_map, goal)
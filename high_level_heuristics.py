@@ -0,0 +1,147 @@
+from mdd import classify_collision, is_dependent, CARDINAL
+
+# Components of the pairwise dependency graph with more agents than this get the matching lower bound instead of the
+# exact minimum weighted vertex cover, see minimum_vertex_cover.
+MAX_EXACT_COMPONENT = 10
+
+
+def minimum_vertex_cover(weights: dict) -> int:
+    """Returns the size of a minimum weighted vertex cover of a graph, or a lower bound of it for large components.
+
+    Every agent gets a non-negative integer value such that for every edge (a1, a2) the values of a1 and a2 sum up to at
+    least the weight of the edge. The minimum sum of the values is a lower bound of the cost increase needed to resolve
+    all edges, so it is an admissible heuristic (for unit weights it is the size of a minimum vertex cover).
+
+    :param weights: {(a1, a2): weight} of the edges
+
+    :return the minimum sum of the values
+    """
+    neighbors = dict()
+    for (a1, a2), weight in weights.items():
+        if weight > 0:
+            neighbors.setdefault(a1, dict())[a2] = weight
+            neighbors.setdefault(a2, dict())[a1] = weight
+
+    total = 0
+    unvisited = set(neighbors)
+    while len(unvisited) > 0:
+        component = [unvisited.pop()]
+        for agent in component:
+            for other in neighbors[agent]:
+                if other in unvisited:
+                    unvisited.remove(other)
+                    component.append(other)
+
+        if len(component) <= MAX_EXACT_COMPONENT:
+            total += _exact_vertex_cover(component, neighbors)
+        else:
+            total += _matching_lower_bound(component, neighbors)
+
+    return total
+
+
+def _exact_vertex_cover(component: list, neighbors: dict) -> int:
+    """Minimum weighted vertex cover of one connected component by depth first branch and bound."""
+    values = dict()
+    best = sum(max(neighbors[agent].values()) for agent in component)  # every agent takes its heaviest edge
+
+    def search(index, total):
+        nonlocal best
+        if total >= best:
+            return
+        if index == len(component):
+            best = total
+            return
+
+        agent = component[index]
+        # the edges to agents that already have a value have to be covered by this agent
+        lowest = max([weight - values[other] for other, weight in neighbors[agent].items() if other in values] + [0])
+        for value in range(lowest, max(neighbors[agent].values()) + 1):
+            values[agent] = value
+            search(index + 1, total + value)
+        del values[agent]
+
+    search(0, 0)
+    return best
+
+
+def _matching_lower_bound(component: list, neighbors: dict) -> int:
+    """Weight of a greedy matching of the component: every matched edge needs its own weight in any vertex cover."""
+    edges = sorted(((weight, agent, other) for agent in component for other, weight in neighbors[agent].items()
+                    if agent < other), reverse=True)
+    matched = set()
+    total = 0
+    for weight, agent, other in edges:
+        if agent not in matched and other not in matched:
+            matched.update((agent, other))
+            total += weight
+    return total
+
+
+def cg_weight(solver, node, collision) -> int:
+    """Conflict graph (CG): agents with a cardinal conflict need at least one cost increase."""
+    mdd1, mdd2 = solver.get_mdd(node, collision['a1']), solver.get_mdd(node, collision['a2'])
+    return 1 if classify_collision(collision, mdd1, mdd2, solver.my_map) == CARDINAL else 0
+
+
+def dg_weight(solver, node, collision) -> int:
+    """Dependency graph (DG): agents without any pair of collision free paths of their costs need a cost increase."""
+    if cg_weight(solver, node, collision) == 1:
+        return 1
+    mdd1, mdd2 = solver.get_mdd(node, collision['a1']), solver.get_mdd(node, collision['a2'])
+    return 1 if is_dependent(mdd1, mdd2) else 0
+
+
+def wdg_weight(solver, node, collision) -> int:
+    """Weighted dependency graph (WDG): dependent agents need the cost increase of their optimal two-agent solution."""
+    if dg_weight(solver, node, collision) == 0:
+        return 0
+
+    a1, a2 = collision['a1'], collision['a2']
+    cost = solver.solve_pair(node, a1, a2)
+    if cost is None:
+        return 1  # the two-agent problem was not solved within its node limit, they are dependent at least
+    return max(1, cost - (len(node['paths'][a1]) - 1) - (len(node['paths'][a2]) - 1))
+
+
+# The high-level heuristics CBSSolver can use, selected with its high_level_heuristic option. Each function returns the
+# edge weight of a pair of colliding agents in the pairwise graph of a CBS node.
+HIGH_LEVEL_HEURISTICS = {
+    'CG': cg_weight,
+    'DG': dg_weight,
+    'WDG': wdg_weight,
+}
+
+
+def get_high_level_heuristic(name: str):
+    """Returns the edge weight function of the high-level heuristic with the given name (one of HIGH_LEVEL_HEURISTICS),
+    or None if name is None."""
+    if name is None:
+        return None
+
+    try:
+        return HIGH_LEVEL_HEURISTICS[name]
+    except KeyError:
+        raise RuntimeError(f'Unknown high-level heuristic {name}! Use one of: {", ".join(HIGH_LEVEL_HEURISTICS)}')
+
+
+def compute_heuristic(solver, node, weight_function) -> int:
+    """Computes the high-level heuristic of a CBS node: the minimum weighted vertex cover of the pairwise graph of the
+    colliding agents.
+
+    The edge weights are stored in node['pair_weights'], which a child node inherits from its parent for all pairs of
+    agents that were not replanned: their constraints only grew, so the inherited weights are still lower bounds.
+
+    :param solver: the CBSSolver
+    :param node: the CBS node
+    :param weight_function: edge weight function, one of HIGH_LEVEL_HEURISTICS
+
+    :return the heuristic value
+    """
+    weights = dict()
+    for pair, collision in node['collision_matrix'].items():
+        if pair not in node['pair_weights']:
+            node['pair_weights'][pair] = weight_function(solver, node, collision)
+        weights[pair] = node['pair_weights'][pair]
+
+    return minimum_vertex_cover(weights)
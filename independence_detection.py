@@ -0,0 +1,128 @@
+import inspect
+import time as timer
+
+import numpy as np
+
+from single_agent_planner import get_sum_of_cost
+from collision_detection import detect_collisions_sparse
+from grid_map import as_grid_map
+from cbs import CBSSolver
+
+
+class IndependenceDetectionSolver(object):
+    """Independence Detection (ID): plans every agent on its own and only merges the groups of agents whose paths
+    collide, which are then planned together by the group solver. Groups of agents that never meet are never searched
+    jointly, so the group solver only sees problems as large as the largest group of interacting agents.
+
+    With an optimal group solver (e.g. CBSSolver) the solution is optimal as well: every group is planned optimally on
+    its own and the paths of different groups do not collide.
+    """
+
+    def __init__(self, my_map, starts, goals, group_solver=CBSSolver, **solver_options):
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
+        starts      - [(x1, y1), (x2, y2), ...] list of start locations
+        goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        group_solver - solver class used for every group, constructed as group_solver(my_map, starts, goals,
+                      **solver_options) and with a find_solution(print_results, return_costs) method, which gets
+                      the time left as time_limit if it has that option
+        solver_options - further arguments of the group solver, e.g. low_level
+        """
+
+        self.my_map = as_grid_map(my_map)
+        self.starts = starts
+        self.goals = goals
+        self.num_of_agents = len(goals)
+
+        self.group_solver = group_solver
+        self.solver_options = solver_options
+
+        self.groups = []  # the groups of agents (sorted tuples), see merge_groups
+        self.num_of_merges = 0
+        self.CPU_time = 0
+
+    def plan_group(self, group, time_limit=300.0):
+        """Plans the paths of the agents of the group together, ignoring all other agents.
+
+        :param time_limit: process time in seconds left for planning the group
+        :return list with the path of every agent of the group, or None if the group solver finds no solution in time
+        """
+        if time_limit <= 0:
+            return None
+
+        solver = self.group_solver(self.my_map, [self.starts[i] for i in group], [self.goals[i] for i in group],
+                                   **self.solver_options)
+        options = dict()
+        if 'time_limit' in inspect.signature(solver.find_solution).parameters:
+            options['time_limit'] = time_limit
+
+        result = solver.find_solution(print_results=False, return_costs=True, **options)
+        if len(result[0]) == 0:
+            return None
+        return result[0]
+
+    def find_solution(self, print_results=True, return_costs=False, time_limit=300.0):
+        """ Finds paths for all agents from their start locations to their goal locations.
+
+        time_limit  - process time in seconds for the whole search, shared by all group solves
+        """
+
+        start_time = timer.process_time()
+
+        paths = self.merge_groups(time_limit)
+        self.CPU_time = timer.process_time() - start_time
+
+        if paths is None:
+            if return_costs:
+                return [], np.nan, self.CPU_time
+            else:
+                return []
+
+        if print_results:
+            print("\n Found a solution! \n")
+            print("CPU time (s):    {:.2f}".format(self.CPU_time))
+            print("Sum of costs:    {}".format(get_sum_of_cost(paths)))
+            print("Groups:          {} (largest: {} agents)".format(len(self.groups),
+                                                                   max(len(group) for group in self.groups)))
+
+        if return_costs:
+            return paths, get_sum_of_cost(paths), self.CPU_time
+        else:
+            return paths
+
+    def merge_groups(self, time_limit=300.0):
+        """Plans every agent on its own, then merges two groups with colliding paths until no paths collide.
+
+        :param time_limit: process time in seconds for all group solves together
+        :return list with the path of every agent, or None if a group has no solution or the time ran out
+        """
+        deadline = timer.process_time() + time_limit
+        self.groups = [(i,) for i in range(self.num_of_agents)]
+        group_of = list(range(self.num_of_agents))  # agent -> index of its group in self.groups
+        paths = []
+
+        for group in self.groups:
+            group_paths = self.plan_group(group, deadline - timer.process_time())
+            if group_paths is None:
+                return None
+            paths += group_paths
+
+        while True:
+            # the agents of a group never collide with each other, so every collision is one between two groups
+            collisions = detect_collisions_sparse(paths)
+            if len(collisions) == 0:
+                return paths
+
+            group1, group2 = sorted((group_of[collisions[0]['a1']], group_of[collisions[0]['a2']]))
+            merged = tuple(sorted(self.groups[group1] + self.groups[group2]))
+            group_paths = self.plan_group(merged, deadline - timer.process_time())
+            if group_paths is None:
+                return None
+
+            self.groups[group1] = merged
+            del self.groups[group2]
+            for index, group in enumerate(self.groups):
+                for i in group:
+                    group_of[i] = index
+            for i, path in zip(merged, group_paths):
+                paths[i] = path
+            self.num_of_merges += 1
@@ -1,17 +1,19 @@
 import time as timer
-from single_agent_planner import compute_heuristics, a_star, get_sum_of_cost
+from single_agent_planner import a_star, get_sum_of_cost
+from grid_map import as_grid_map
+from heuristic_cache import get_heuristics
 
 
 class IndependentSolver(object):
     """A planner that plans for each robot independently."""
 
     def __init__(self, my_map, starts, goals):
-        """my_map   - list of lists specifying obstacle positions
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
         """
 
-        self.my_map = my_map
+        self.my_map = as_grid_map(my_map)
         self.starts = starts
         self.goals = goals
         self.num_of_agents = len(goals)
@@ -22,7 +24,7 @@ class IndependentSolver(object):
         # compute heuristics for the low-level search
         self.heuristics = []
         for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+            self.heuristics.append(get_heuristics(self.my_map, goal))
 
     def find_solution(self):
         """ Finds paths for all agents from their start locations to their goal locations."""
@@ -2,6 +2,8 @@ from pathlib import Path
 
 import numpy as np
 
+from grid_map import GridMap
+
 
 def print_mapf_instance(my_map, starts, goals):
     """
@@ -63,8 +65,7 @@ def import_mapf_instance(filename):
         s1 1 1 1 3      # agent group one has starting rectangle spanning from (1, 1) to (1, 3)
         g1 1 4 1 3      # agent group one has goal rectangle spanning from (1, 4) to (1, 3)
 
-
-
+    The map is returned as a GridMap.
     """
     f = Path(filename)
     if not f.is_file():
@@ -117,4 +118,4 @@ def import_mapf_instance(filename):
 
     f.close()
 
-    return map, agent_groups, group_sizes, start_groups, goal_groups
+    return GridMap(map), agent_groups, group_sizes, start_groups, goal_groups
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+
+from grid_map import as_grid_map
+from single_agent_planner import a_star
+from sipp import sipp
+
+# The low-level searches the solvers can use, selected with their low_level option. All of them take the same arguments
+# as a_star and return a path or None.
+LOW_LEVEL_SEARCHES = {
+    'A*': a_star,
+    'SIPP': sipp,
+}
+
+
+class LowLevelCache(object):
+    """Cache of low-level search results, keyed by search, map fingerprint, start, goal and the constraints that apply
+    to the agent (see constraint_fingerprint).
+
+    CBS replans the same agent with the same constraints in different subtrees, and distributed agents resolve the same
+    conflicts again and again. The heuristic table is not part of the key: the solvers get it from the heuristic cache,
+    so it is determined by the map and the goal. The agent itself is not part of the key either, the constraint
+    fingerprint does not depend on it (distributed agents are their own agent id, they would never be found again).
+
+    Failed searches (None) are not cached: most of them ran out of time, which another search may not.
+
+    The conflict avoidance table breaks ties between paths of the same cost, so its fingerprint is part of the key: a path
+    found avoiding other paths is not returned for a table with different paths. No table and an empty table share
+    their key, they give the same path.
+
+    The results are kept in a bounded least recently used cache.
+    """
+
+    def __init__(self, max_size=4096):
+        """
+        :param max_size: maximum number of search results kept in memory
+        """
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._results = OrderedDict()
+
+    def search(self, search, my_map, start_loc, goal_loc, h_values, agent, constraints, conflict_avoidance_table=None):
+        """Returns the result of search (see a_star) for the arguments, running it if it is not cached yet."""
+        grid = as_grid_map(my_map)
+        key = (search.__name__, grid.fingerprint, tuple(start_loc), tuple(goal_loc),
+               constraint_fingerprint(constraints, agent),
+               conflict_avoidance_table.fingerprint if conflict_avoidance_table is not None else 0)
+
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.hits += 1
+            path = self._results[key]
+        else:
+            self.misses += 1
+            path = search(grid, start_loc, goal_loc, h_values, agent, constraints,
+                          conflict_avoidance_table=conflict_avoidance_table)
+            if path is None:
+                return None
+
+            self._results[key] = path
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)  # evict the least recently used result
+
+        return list(path)  # a copy, the caller may change its path
+
+    def clear(self):
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._results)
+
+
+def constraint_fingerprint(constraints, agent) -> frozenset:
+    """Returns the constraints that apply to the agent in a canonical, hashable form: its own constraints and the
+    positive constraints of other agents (see build_constraint_table), independent of their order."""
+    fingerprint = []
+    for constraint in constraints:
+        own = constraint['agent'] == agent
+        positive = constraint.get('positive', False)
+        if not own and not positive:
+            continue
+
+        loc = constraint['loc']
+        if isinstance(loc[0], tuple):  # edge constraint
+            loc = (tuple(loc[0]), tuple(loc[1]))
+        else:
+            loc = tuple(loc)
+        fingerprint.append((own, positive, loc, constraint['timestep'], constraint.get('start_time')))
+
+    return frozenset(fingerprint)
+
+
+# Process wide cache used by the memoized low-level searches.
+low_level_cache = LowLevelCache()
+
+
+def memoize(search):
+    """Returns search with its results cached in low_level_cache. Searches with a prebuilt constraint table (e.g. a
+    ReservationTable, which changes while planning) are not cached."""
+    def memoized_search(my_map, start_loc, goal_loc, h_values, agent, constraints, constraint_table=None,
+                        conflict_avoidance_table=None):
+        if constraint_table is not None:
+            return search(my_map, start_loc, goal_loc, h_values, agent, constraints, constraint_table=constraint_table,
+                          conflict_avoidance_table=conflict_avoidance_table)
+        return low_level_cache.search(search, my_map, start_loc, goal_loc, h_values, agent, constraints,
+                                      conflict_avoidance_table)
+
+    memoized_search.__name__ = search.__name__
+    return memoized_search
+
+
+def get_low_level_search(name: str, memoized=True):
+    """Returns the low-level search function with the given name (one of LOW_LEVEL_SEARCHES).
+
+    :param memoized: whether the results of the search are cached in low_level_cache, see memoize
+    """
+    try:
+        search = LOW_LEVEL_SEARCHES[name]
+    except KeyError:
+        raise RuntimeError(f'Unknown low-level search {name}! Use one of: {", ".join(LOW_LEVEL_SEARCHES)}')
+
+    return memoize(search) if memoized else search
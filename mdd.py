@@ -0,0 +1,109 @@
+from grid_map import as_grid_map
+
+# Classes of a conflict between two agents, see classify_collision. Higher is better to split on.
+NON_CARDINAL = 0
+SEMI_CARDINAL = 1
+CARDINAL = 2
+
+
+class MDD(object):
+    """Multi-valued decision diagram of an agent: for every timestep the cells the agent can occupy on any path of a
+    given cost from its start to its goal location that satisfies its constraints."""
+
+    def __init__(self, my_map, start_loc, goal_loc, h_values, cost: int, constraint_table):
+        """
+        :param my_map: the map (GridMap or list of lists)
+        :param start_loc: start location of the agent
+        :param goal_loc: goal location of the agent
+        :param h_values: heuristic table of the goal location, see compute_heuristics
+        :param cost: the cost of the paths, the length of the path of the agent minus one
+        :param constraint_table: the constraint table of the agent, see build_constraint_table
+        """
+        grid = as_grid_map(my_map)
+        self.cost = cost
+        self.goal_cell = int(grid.index(goal_loc))
+
+        # forward: all moves that are allowed and can still reach the goal in time
+        levels = [{int(grid.index(start_loc))}]
+        moves = []  # moves[t] - set of allowed (cell at t, cell at t + 1)
+        for time in range(1, cost + 1):
+            level_moves = {(cell, next_cell)
+                           for cell in levels[-1] for next_cell in grid.neighbors[cell] + (cell,)
+                           if h_values.item(next_cell) <= cost - time
+                           and not constraint_table.is_constrained(cell, next_cell, time)}
+            moves.append(level_moves)
+            levels.append({next_cell for _, next_cell in level_moves})
+
+        # backward: only keep the cells from which the goal is reached at timestep cost
+        levels[-1] &= {self.goal_cell}
+        for time in range(cost - 1, -1, -1):
+            moves[time] = {(cell, next_cell) for cell, next_cell in moves[time] if next_cell in levels[time + 1]}
+            levels[time] = {cell for cell, _ in moves[time]}
+
+        self.levels = [frozenset(level) for level in levels]
+        self.moves = []  # moves[t] - {cell at t: cells at t + 1 on a path of the MDD}
+        for level_moves in moves:
+            self.moves.append(dict())
+            for cell, next_cell in level_moves:
+                self.moves[-1].setdefault(cell, []).append(next_cell)
+
+    def children(self, cell: int, time: int) -> list:
+        """Returns the cells the agent can move to from the cell at the timestep, after the cost it stays at its goal."""
+        if time >= self.cost:
+            return [self.goal_cell]
+        return self.moves[time].get(cell, [])
+
+    def cells(self, time: int) -> frozenset:
+        """Returns the cells the agent can occupy at the timestep, after the cost the agent stays at its goal."""
+        if time <= self.cost:
+            return self.levels[time]
+        return frozenset((self.goal_cell,))
+
+    def is_forced(self, cell: int, time: int) -> bool:
+        """Returns whether every path of the MDD is in the cell at the timestep."""
+        return self.cells(time) == {cell}
+
+
+def is_dependent(mdd1: MDD, mdd2: MDD) -> bool:
+    """Returns whether two agents are dependent: every pair of their paths in the MDDs collides, so the agents cannot
+    both keep their cost. This is checked by a breadth-first search over the joint MDD of the two agents."""
+    states = {(cell1, cell2) for cell1 in mdd1.cells(0) for cell2 in mdd2.cells(0) if cell1 != cell2}
+    for time in range(max(mdd1.cost, mdd2.cost)):
+        states = {(next1, next2)
+                  for cell1, cell2 in states
+                  for next1 in mdd1.children(cell1, time) for next2 in mdd2.children(cell2, time)
+                  if next1 != next2 and not (next1 == cell2 and next2 == cell1)}
+        if len(states) == 0:
+            return True
+
+    return len(states) == 0
+
+
+def classify_collision(collision: dict, mdd1: MDD, mdd2: MDD, my_map) -> int:
+    """Classifies a collision between agents a1 and a2 with their MDDs.
+
+    A collision is cardinal if both agents cannot avoid it without increasing their cost, semi-cardinal if one of them
+    cannot, and non-cardinal otherwise. Splitting on cardinal collisions first increases the cost of the CBS children
+    and thereby keeps the high-level tree small.
+
+    :param collision: collision dictionary ({'a1', 'a2', 'loc', 'timestep'}), see detect_collisions
+    :param mdd1: MDD of the path of a1
+    :param mdd2: MDD of the path of a2
+    :param my_map: the map (GridMap or list of lists)
+
+    :return CARDINAL, SEMI_CARDINAL or NON_CARDINAL
+    """
+    grid = as_grid_map(my_map)
+    time = collision['timestep']
+
+    if type(collision['loc']) is tuple:
+        cell = int(grid.index(collision['loc']))
+        forced = [mdd1.is_forced(cell, time), mdd2.is_forced(cell, time)]
+    else:
+        from_cell, to_cell = int(grid.index(collision['loc'][0])), int(grid.index(collision['loc'][1]))
+        forced = [mdd1.is_forced(from_cell, time - 1) and mdd1.is_forced(to_cell, time),
+                  mdd2.is_forced(to_cell, time - 1) and mdd2.is_forced(from_cell, time)]
+
+    if all(forced):
+        return CARDINAL
+    return SEMI_CARDINAL if any(forced) else NON_CARDINAL
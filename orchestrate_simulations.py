@@ -3,7 +3,10 @@ import os
 import time as timer
 
 from cbs import CBSSolver
+from ecbs import ECBSSolver
+from independence_detection import IndependenceDetectionSolver
 from prioritized import PrioritizedPlanningSolver
+from pbs import PBSSolver
 from distributed import DistributedPlanningSolver
 
 import numpy as np
@@ -13,13 +16,18 @@ import scipy.stats
 
 
 class Case:
-    def __init__(self, input, planner, map, sim_id, case_id):
-        """"Initiates a Case instance. Used to run one certain simulation with a planner, map, and agent input."""
+    def __init__(self, input, planner, map, sim_id, case_id, anytime=False):
+        """"Initiates a Case instance. Used to run one certain simulation with a planner, map, and agent input.
+
+        :param anytime: run CBS in anytime mode (see CBSSolver.find_solution), its computation time then includes
+                        the prioritized planning that seeds the incumbent
+        """
         self.input = input
         self.planner = planner
         self.map = map
         self.sim_id = sim_id
         self.id = case_id
+        self.anytime = anytime
 
     def run(self):
         input = self.input
@@ -29,20 +37,33 @@ class Case:
 
         if self.planner == "CBS":
             solver = CBSSolver(self.map, starts, goals)
+        elif self.planner == "ECBS":
+            solver = ECBSSolver(self.map, starts, goals)
+        elif self.planner == "ID":
+            solver = IndependenceDetectionSolver(self.map, starts, goals)
         elif self.planner == "Prioritized":
             solver = PrioritizedPlanningSolver(self.map, starts, goals)
+        elif self.planner == "PBS":
+            solver = PBSSolver(self.map, starts, goals)
         elif self.planner == "Distributed":
             solver = DistributedPlanningSolver(self.map, starts, goals)
         else:
             raise RuntimeError("Unknown solver!")
 
-        paths, total_cost, total_computation_time = solver.find_solution(print_results=False, return_costs=True)
+        if self.planner == "CBS":
+            paths, total_cost, total_computation_time = solver.find_solution(print_results=False, return_costs=True,
+                                                                             anytime=self.anytime)
+        else:
+            paths, total_cost, total_computation_time = solver.find_solution(print_results=False, return_costs=True)
 
-        return total_cost, total_computation_time, starts, goals, self.sim_id, self.id
+        # only CBS and ECBS know a lower bound of the optimal cost
+        optimality_gap = solver.optimality_gap if self.planner in ("CBS", "ECBS") else np.nan
+
+        return total_cost, total_computation_time, starts, goals, self.sim_id, self.id, optimality_gap
 
 
 class Orchestrator:
-    def __init__(self, my_map, num_agents: dict, start_groups: dict, goal_groups: dict, planner):
+    def __init__(self, my_map, num_agents: dict, start_groups: dict, goal_groups: dict, planner, anytime=False):
         """" Initiates orchestrator iterator. Determines all possible start-goal combinations that fit the inputs. So
         that is the cartesian product of all the possible start-goal combinations for each agent group.
         
@@ -51,6 +72,7 @@ class Orchestrator:
         :param start_groups: the possible start location for each agent group
         :param goal_groups: the possible goal_groups for each goal group
         :param planner: planner type used in the simulations
+        :param anytime: run CBS in anytime mode, see Case
         """
 
         self.start_time = timer.time()
@@ -64,7 +86,7 @@ class Orchestrator:
         # for every kpi, add 4 columns in the results table: kpi, kpi_mean, kpi_std, kpi_var
         col_names = ['starts', 'goals'] + list(
             itertools.chain(*[[kpi, kpi+'_var', kpi+'_mean', kpi+'_std'] for kpi in self.simulations_kpis])
-        )
+        ) + ['Optimality gap']  # only logged, not a kpi: 0 for optimal solutions
         self.simulation_results = pd.DataFrame(
             columns=col_names
         )
@@ -75,6 +97,7 @@ class Orchestrator:
 
         self.map = my_map
         self.planner = planner
+        self.anytime = anytime
 
         self.num_agents = num_agents
         self.agent_groups = list(start_groups.keys())
@@ -88,7 +111,7 @@ class Orchestrator:
 
     def store_result(self, results):
 
-        (total_cost, total_computation_time, starts, goals, sim_id, id) = results
+        (total_cost, total_computation_time, starts, goals, sim_id, id, optimality_gap) = results
 
         print(total_cost, total_computation_time)
         # Build the dictionary that will eventually be the new row in the results table
@@ -96,7 +119,8 @@ class Orchestrator:
             self.simulations_kpis[0]: total_cost,
             self.simulations_kpis[1]: total_computation_time,
             'starts': str(starts),
-            'goals': str(goals)
+            'goals': str(goals),
+            'Optimality gap': optimality_gap
         }
 
         # Now for each KPI, store mean, std and variation coefficient in the dictionary as well
@@ -187,7 +211,9 @@ class Orchestrator:
 
             self.simulation_inputs.append(next_input)  # save the input for logging purposes
             self.simulation_id += 1
-            return next_input, self.planner, self.map, self.simulation_id
+
+            # The map is not part of the case: workers get it (and its heuristic tables) once through shared memory.
+            return next_input, self.planner, self.simulation_id, self.anytime
 
     def save_results(self):
         """"Stores the results of the simulations in a .csv file and a plot figure. """
@@ -0,0 +1,213 @@
+import time as timer
+
+import numpy as np
+
+from single_agent_planner import get_sum_of_cost, ReservationTable, ConflictAvoidanceTable
+from low_level import get_low_level_search
+from cbs import detect_collision, detect_collisions, update_collision_matrix, get_collisions
+from collision_detection import detect_collisions_vectorized, VECTORIZE_MIN_PATHS
+from grid_map import as_grid_map
+from heuristic_cache import get_heuristics
+
+
+def get_higher_agents(priorities: frozenset, agent: int) -> set:
+    """Returns all agents with a higher priority than the agent, also through other agents.
+
+    :param priorities: set of pairs (higher agent, lower agent)
+    """
+    higher = set()
+    stack = [agent]
+    while len(stack) > 0:
+        curr = stack.pop()
+        for high, low in priorities:
+            if low == curr and high not in higher:
+                higher.add(high)
+                stack.append(high)
+    return higher
+
+
+def get_lower_agents(priorities: frozenset, agent: int) -> set:
+    """Returns all agents with a lower priority than the agent, also through other agents."""
+    return get_higher_agents(frozenset((low, high) for high, low in priorities), agent)
+
+
+class PBSSolver(object):
+    """Priority-Based Search: prioritized planning that searches over priority orderings instead of using a fixed one.
+
+    Every node of the (depth-first) high-level search has a partial priority ordering, in which every agent avoids the
+    paths of all agents with a higher priority. A collision of two agents is resolved by two children, each giving one
+    of the agents a higher priority than the other, so an ordering is only fixed where agents collide.
+    """
+
+    def __init__(self, my_map, starts, goals, low_level='A*'):
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
+        starts      - [(x1, y1), (x2, y2), ...] list of start locations
+        goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        low_level   - the low-level search to use, one of LOW_LEVEL_SEARCHES ('A*' or 'SIPP')
+        """
+
+        self.start_time = 0
+        self.my_map = as_grid_map(my_map)
+        self.low_level_search = get_low_level_search(low_level)
+        self.starts = starts
+        self.goals = goals
+        self.num_of_agents = len(goals)
+
+        self.num_of_generated = 0
+        self.num_of_expanded = 0
+        self.CPU_time = 0
+
+        self.stack = []
+
+        # compute heuristics for the low-level search
+        self.heuristics = []
+        for goal in self.goals:
+            self.heuristics.append(get_heuristics(self.my_map, goal))
+
+    def push_node(self, node):
+        self.stack.append(node)
+        self.num_of_generated += 1
+
+    def pop_node(self):
+        node = self.stack.pop()
+        self.num_of_expanded += 1
+        return node
+
+    def plan_path(self, node, agent):
+        """Plans the path of the agent in the node, avoiding the paths of all agents with a higher priority.
+
+        :return the path, or None if no path is found
+        """
+        higher = get_higher_agents(node['priorities'], agent)
+
+        reservation_table = ReservationTable(self.my_map)
+        for other in higher:
+            reservation_table.reserve_path(node['paths'][other], other)
+
+        # the other agents are not avoided at all cost, but only where that costs nothing
+        conflict_avoidance_table = ConflictAvoidanceTable(
+            self.my_map, [path for other, path in enumerate(node['paths']) if other != agent and other not in higher])
+
+        return self.low_level_search(self.my_map, self.starts[agent], self.goals[agent], self.heuristics[agent], agent,
+                                     [], constraint_table=reservation_table,
+                                     conflict_avoidance_table=conflict_avoidance_table)
+
+    def update_plan(self, node, agent) -> bool:
+        """Replans the agent in the node, and then every agent with a lower priority whose path collides with an agent
+        with a higher priority than itself, in an order consistent with the priorities.
+
+        :return whether paths were found for all of them
+        """
+        agents = get_lower_agents(node['priorities'], agent) | {agent}
+        higher = {other: get_higher_agents(node['priorities'], other) for other in agents}
+
+        while len(agents) > 0:
+            # the next agent whose higher agents are all planned already
+            curr = min(other for other in agents if len(higher[other] & agents) == 0)
+            agents.remove(curr)
+
+            if curr != agent and all(detect_collision(node['paths'][curr], node['paths'][other])[0] is None
+                                     for other in higher[curr]):
+                continue
+
+            path = self.plan_path(node, curr)
+            if path is None:
+                return False
+
+            node['paths'] = node['paths'][:curr] + (tuple(path),) + node['paths'][curr + 1:]
+            node['collision_matrix'] = update_collision_matrix(node['collision_matrix'], node['paths'], curr)
+
+        return True
+
+    def find_solution(self, print_results=True, return_costs=False, time_limit=300.0):
+        """ Finds paths for all agents from their start locations to their goal locations.
+
+        time_limit  - process time in seconds after which the search stops
+        """
+
+        self.start_time = timer.process_time()
+
+        # Generate the root node
+        # priorities    - set of pairs (higher agent, lower agent), empty at the root
+        # paths         - tuple of paths, one for each agent, shared with the parent except for the replanned agents
+        # collision_matrix - the first collision of every colliding pair of agents, see update_collision_matrix
+        # collisions    - list of collisions in paths
+        root = {'cost': 0,
+                'priorities': frozenset(),
+                'paths': (),
+                'collision_matrix': {},
+                'collisions': []}
+
+        conflict_avoidance_table = ConflictAvoidanceTable(self.my_map)
+        for i in range(self.num_of_agents):  # Find initial path for each agent, avoiding the ones planned before
+            path = self.low_level_search(self.my_map, self.starts[i], self.goals[i], self.heuristics[i], i, [],
+                                         conflict_avoidance_table=conflict_avoidance_table)
+            if path is None:  # no path at all, or the low-level search ran out of time
+                self.CPU_time = timer.process_time() - self.start_time
+                if return_costs:
+                    return [], np.nan, self.CPU_time
+                else:
+                    return []
+            root['paths'] += (tuple(path),)
+            conflict_avoidance_table.add_path(path)
+
+        root['cost'] = get_sum_of_cost(root['paths'])
+        if self.num_of_agents < VECTORIZE_MIN_PATHS:
+            root['collisions'] = detect_collisions(root['paths'])
+        else:
+            root['collisions'] = detect_collisions_vectorized(root['paths'])
+        root['collision_matrix'] = {(collision['a1'], collision['a2']): collision for collision in root['collisions']}
+        self.push_node(root)
+
+        while len(self.stack) > 0:
+            run_time = timer.process_time() - self.start_time
+            if run_time >= time_limit:
+                break
+
+            parent = self.pop_node()
+
+            if len(parent['collisions']) == 0:
+                paths = [list(path) for path in parent['paths']]
+                self.CPU_time = timer.process_time() - self.start_time
+                if print_results:
+                    self.print_results(parent)
+                if return_costs:
+                    return paths, get_sum_of_cost(paths), self.CPU_time
+                else:
+                    return paths
+
+            collision = parent['collisions'][0]
+
+            children = []
+            for high, low in ((collision['a1'], collision['a2']), (collision['a2'], collision['a1'])):
+                if low in get_higher_agents(parent['priorities'], high):
+                    continue  # the opposite ordering is already implied
+
+                child = {'cost': 0,
+                         'priorities': parent['priorities'] | {(high, low)},
+                         'paths': parent['paths'],
+                         'collision_matrix': parent['collision_matrix'],
+                         'collisions': []}
+
+                if self.update_plan(child, low):
+                    child['cost'] = get_sum_of_cost(child['paths'])
+                    child['collisions'] = get_collisions(child['collision_matrix'])
+                    children.append(child)
+
+            # depth-first: the cheaper child is expanded first
+            for child in sorted(children, key=lambda node: node['cost'], reverse=True):
+                self.push_node(child)
+
+        self.CPU_time = timer.process_time() - self.start_time
+        if return_costs:
+            return [], np.nan, self.CPU_time
+        else:
+            return []
+
+    def print_results(self, node):
+        print("\n Found a solution! \n")
+        print("CPU time (s):    {:.2f}".format(self.CPU_time))
+        print("Sum of costs:    {}".format(get_sum_of_cost(node['paths'])))
+        print("Expanded nodes:  {}".format(self.num_of_expanded))
+        print("Generated nodes: {}".format(self.num_of_generated))
+        print("Priorities:      {}".format(len(node['priorities'])))
@@ -2,19 +2,24 @@ import time as timer
 
 import numpy as np
 
-from single_agent_planner import compute_heuristics, a_star, get_sum_of_cost
+from single_agent_planner import get_sum_of_cost, ReservationTable, ConflictAvoidanceTable
+from low_level import get_low_level_search
+from grid_map import as_grid_map
+from heuristic_cache import get_heuristics
 
 
 class PrioritizedPlanningSolver(object):
     """A planner that plans for each robot sequentially."""
 
-    def __init__(self, my_map, starts, goals):
-        """my_map   - list of lists specifying obstacle positions
+    def __init__(self, my_map, starts, goals, low_level='A*'):
+        """my_map   - GridMap (or list of lists) specifying obstacle positions
         starts      - [(x1, y1), (x2, y2), ...] list of start locations
         goals       - [(x1, y1), (x2, y2), ...] list of goal locations
+        low_level   - the low-level search to use, one of LOW_LEVEL_SEARCHES ('A*' or 'SIPP')
         """
 
-        self.my_map = my_map
+        self.my_map = as_grid_map(my_map)
+        self.low_level_search = get_low_level_search(low_level)
         self.starts = starts
         self.goals = goals
         self.num_of_agents = len(goals)
@@ -24,52 +29,46 @@ class PrioritizedPlanningSolver(object):
         # compute heuristics for the low-level search
         self.heuristics = []
         for goal in self.goals:
-            self.heuristics.append(compute_heuristics(my_map, goal))
+            self.heuristics.append(get_heuristics(self.my_map, goal))
 
-    def find_solution(self, print_results=True, return_costs=False):
-        """ Finds paths for all agents from their start locations to their goal locations."""
+    def find_solution(self, print_results=True, return_costs=False, conflict_avoidance=False):
+        """ Finds paths for all agents from their start locations to their goal locations.
+
+        conflict_avoidance - let every agent avoid the shortest paths of the agents planned after it where that costs
+                      nothing (see ConflictAvoidanceTable). Finding those paths takes one more low-level search per
+                      agent. The agents planned before it are reserved already, so they are not in the table.
+        """
 
         start_time = timer.process_time()
         result = []
-        constraints = []
+
+        # Every planned path is written once into the reservation table, which all later agents avoid.
+        reservation_table = ReservationTable(self.my_map)
+
+        # The agents planned later will most likely take their shortest path, the conflict avoidance table makes the
+        # earlier agents stay out of their way where that does not cost anything.
+        conflict_avoidance_table = None
+        shortest_paths = [None] * self.num_of_agents
+        if conflict_avoidance:
+            conflict_avoidance_table = ConflictAvoidanceTable(self.my_map)
+            shortest_paths = [self.low_level_search(self.my_map, self.starts[i], self.goals[i], self.heuristics[i], i,
+                                                    []) for i in range(self.num_of_agents)]
+            for path in shortest_paths:
+                if path is not None:
+                    conflict_avoidance_table.add_path(path)
 
         for i in range(self.num_of_agents):  # Find path for each agent
-            #print('before')
-            #print(self.my_map, ", ",self.starts[i], ", ", self.goals[i], ", ", self.heuristics[i], ", ", i, ", ", constraints)
-            path = a_star(self.my_map, self.starts[i], self.goals[i], self.heuristics[i],
-                          i, constraints)
-            #print('after')
+            if shortest_paths[i] is not None:
+                conflict_avoidance_table.remove_path(shortest_paths[i])
+
+            path = self.low_level_search(self.my_map, self.starts[i], self.goals[i], self.heuristics[i],
+                                         i, [], constraint_table=reservation_table,
+                                         conflict_avoidance_table=conflict_avoidance_table)
             if path is None:
                 return [], np.nan, timer.process_time() - start_time
             result.append(path)
 
-            for agent in range(self.num_of_agents):
-                for time in range(len(path)):
-                    if agent > i:  # only add constraints for future agents
-                        constraints.append(  # apply vertex constraints
-                            {
-                                'agent': agent,
-                                'loc': path[time],
-                                'timestep': time,
-                            }
-                        )
-                        constraints.append(  # apply edge constraints
-                            {
-                                'agent': agent,
-                                'loc': [path[time], path[time-1]],
-                                'timestep': time
-                            }
-                        )
-                # apply vertex constraint for finished agents. 'start_time' is when the constraint should apply
-                constraints.append(
-                    {
-                        'agent': agent,
-                        'loc': path[-1],
-                        'timestep': -1,
-                        'start_time': len(path) - 1
-                    }
-                )
-
+            reservation_table.reserve_path(path, i)
 
         self.CPU_time = timer.process_time() - start_time
 
@@ -9,13 +9,20 @@ import argparse
 import glob
 from pathlib import Path
 from cbs import CBSSolver
+from ecbs import ECBSSolver
+from independence_detection import IndependenceDetectionSolver
 from independent import IndependentSolver
 from prioritized import PrioritizedPlanningSolver
+from pbs import PBSSolver
 from distributed import DistributedPlanningSolver # Placeholder for Distributed Planning
 from visualize import Animation
 from single_agent_planner import get_sum_of_cost
+from grid_map import GridMap
 
 SOLVER = "CBS"
+LOW_LEVEL = "A*"
+SUBOPTIMALITY = 1.5
+TIME_LIMIT = 300.0
 
 def print_mapf_instance(my_map, starts, goals):
     """
@@ -73,6 +80,8 @@ def import_mapf_instance(filename):
         2               # 2 agents in this experiment
         1 1 1 5         # agent 1 starts at (1,1) and has (1,5) as goal
         1 2 1 4         # agent 2 starts at (1,2) and has (1,4) as goal
+
+    The map is returned as a GridMap.
     """
     f = Path(filename)
     if not f.is_file():
@@ -105,7 +114,7 @@ def import_mapf_instance(filename):
         starts.append((sx, sy))
         goals.append((gx, gy))
     f.close()
-    return my_map, starts, goals
+    return GridMap(my_map), starts, goals
 
 
 if __name__ == '__main__':
@@ -117,7 +126,21 @@ if __name__ == '__main__':
     parser.add_argument('--disjoint', action='store_true', default=False,
                         help='Use the disjoint splitting')
     parser.add_argument('--solver', type=str, default=SOLVER,
-                        help='The solver to use (one of: {CBS,Independent,Prioritized}), defaults to ' + str(SOLVER))
+                        help='The solver to use (one of: {CBS,ECBS,ID,Independent,Prioritized,PBS}), defaults to ' + str(SOLVER))
+    parser.add_argument('--low-level', type=str, default=LOW_LEVEL,
+                        help='The low-level search to use (one of: {A*,SIPP}), defaults to ' + str(LOW_LEVEL))
+    parser.add_argument('--heuristic', type=str, default=None,
+                        help='The high-level heuristic of CBS (one of: {CG,DG,WDG}), defaults to none')
+    parser.add_argument('--merge-bound', type=int, default=None,
+                        help='Merge agents of CBS into a meta-agent after this many collisions (MA-CBS), defaults to '
+                             'never')
+    parser.add_argument('--suboptimality', type=float, default=SUBOPTIMALITY,
+                        help='The suboptimality factor w of ECBS, defaults to ' + str(SUBOPTIMALITY))
+    parser.add_argument('--anytime', action='store_true', default=False,
+                        help='Return the best solution CBS found within the time limit instead of none')
+    parser.add_argument('--time-limit', type=float, default=TIME_LIMIT,
+                        help='CPU time limit in seconds of the search solvers (CBS, ECBS, ID and PBS), defaults to '
+                             + str(TIME_LIMIT))
 
     args = parser.parse_args()
     # Hint: Command line options can be added in Spyder by pressing CTRL + F6 > Command line options. 
@@ -136,19 +159,33 @@ if __name__ == '__main__':
 
         if args.solver == "CBS":
             print("***Run CBS***")
-            cbs = CBSSolver(my_map, starts, goals)
-            paths = cbs.find_solution(args.disjoint)
+            cbs = CBSSolver(my_map, starts, goals, low_level=args.low_level, high_level_heuristic=args.heuristic)
+            paths = cbs.find_solution(args.disjoint, merge_bound=args.merge_bound, anytime=args.anytime,
+                                      time_limit=args.time_limit)
+        elif args.solver == "ECBS":
+            print("***Run ECBS***")
+            ecbs = ECBSSolver(my_map, starts, goals, w=args.suboptimality)
+            paths = ecbs.find_solution(args.disjoint, time_limit=args.time_limit)
+        elif args.solver == "ID":
+            print("***Run Independence Detection with CBS***")
+            solver = IndependenceDetectionSolver(my_map, starts, goals, low_level=args.low_level,
+                                                 high_level_heuristic=args.heuristic)
+            paths = solver.find_solution(time_limit=args.time_limit)
         elif args.solver == "Independent":
             print("***Run Independent***")
             solver = IndependentSolver(my_map, starts, goals)
             paths = solver.find_solution()
         elif args.solver == "Prioritized":
             print("***Run Prioritized***")
-            solver = PrioritizedPlanningSolver(my_map, starts, goals)
+            solver = PrioritizedPlanningSolver(my_map, starts, goals, low_level=args.low_level)
             paths = solver.find_solution()
+        elif args.solver == "PBS":
+            print("***Run PBS***")
+            solver = PBSSolver(my_map, starts, goals, low_level=args.low_level)
+            paths = solver.find_solution(time_limit=args.time_limit)
         elif args.solver == "Distributed":  # Wrapper of distributed planning solver class
             print("***Run Distributed Planning***")
-            solver = DistributedPlanningSolver(my_map, starts, goals)
+            solver = DistributedPlanningSolver(my_map, starts, goals, low_level=args.low_level)
             paths = solver.find_solution()
         else: 
             raise RuntimeError("Unknown solver!")
@@ -8,6 +8,8 @@ import numpy as np
 
 from orchestrate_simulations import Orchestrator, Case
 from library_open_simulation_config import *
+from heuristic_cache import heuristic_cache
+from shared_tables import SharedTables
 SOLVER = "CBS"
 
 def save_unfinished(case_set: set):
@@ -24,10 +26,16 @@ def case_to_tuple(case):
 def case_from_tuple(t):
     return {'starts': list(t[0]), 'goals': list(t[1])}
 
-def worker(q_cases, q_results):
+def worker(q_cases, q_results, shared_tables: SharedTables, heuristic_directory=None):
+    heuristic_cache.directory = heuristic_directory
+
+    # attach once to the map and heuristic tables published by the parent process, instead of receiving the map with
+    # every case and recomputing its heuristics.
+    my_map = shared_tables.attach()
+
     while True:
         c = q_cases.get()
-        case = Case(c[0], c[1], c[2], c[3], c[0]['id'])
+        case = Case(c[0], c[1], my_map, c[2], c[0]['id'], anytime=c[3])
 
         # print('running case')
         result = case.run()
@@ -129,9 +137,14 @@ if __name__ == '__main__':
     parser.add_argument('--instance', type=str, default=None,
                         help='The name of the instance file(s)')
     parser.add_argument('--solver', type=str, default=SOLVER,
-                        help='The solver to use (one of: {CBS,Independent,Prioritized}), defaults to ' + str(SOLVER))
+                        help='The solver to use (one of: {CBS,ECBS,ID,Independent,Prioritized,PBS}), defaults to ' + str(SOLVER))
+    parser.add_argument('--anytime', action='store_true', default=False,
+                        help='Return the best solution CBS found within its time limit instead of none')
+    parser.add_argument('--heuristic-cache', type=str, default=None,
+                        help='Directory in which heuristic tables are stored, so workers do not recompute them')
 
     args = parser.parse_args()
+    heuristic_cache.directory = args.heuristic_cache
 
     result_file = open("results.csv", "w", buffering=1)
 
@@ -141,6 +154,9 @@ if __name__ == '__main__':
         my_map, agent_groups, group_sizes, start_groups, goal_groups = import_mapf_instance(file)
         print_mapf_instance(my_map, start_groups, goal_groups)
 
+        # compute the heuristic table of every possible goal cell once and share them (and the map) with the workers.
+        shared_tables = SharedTables.publish(my_map, itertools.chain(*goal_groups.values()))
+
         for size_combination in itertools.product(*[range(*group_size) for group_size in group_sizes.values()]):
             num_agents = {agent_groups[i]: size_combination[i] for i in range(len(agent_groups))}
 
@@ -149,7 +165,8 @@ if __name__ == '__main__':
                 num_agents=num_agents,
                 start_groups=start_groups,
                 goal_groups=goal_groups,
-                planner=args.solver
+                planner=args.solver,
+                anytime=args.anytime
             )
 
             n_workers = 2
@@ -158,7 +175,7 @@ if __name__ == '__main__':
             q_cases = multiprocessing.Queue()
             q_results = multiprocessing.Queue()
 
-            workers = [multiprocessing.Process(target=worker, args=(q_cases, q_results,), daemon=False) for w in range(n_workers)]
+            workers = [multiprocessing.Process(target=worker, args=(q_cases, q_results, shared_tables, args.heuristic_cache), daemon=False) for w in range(n_workers)]
             # worker = multiprocessing.Process(target=worker, args=(q_cases, q_results,), daemon=False)
             it = simulation_orchestrator
             gen = multiprocessing.Process(target=generator, args=(q_cases, q_results, it, n_initial, n_workers), daemon=False)
@@ -180,4 +197,6 @@ if __name__ == '__main__':
             # simulation_orchestrator.save_results()
             print('complete')
 
+        shared_tables.unlink()
+
         print('complete complete')
\ No newline at end of file
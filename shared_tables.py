@@ -0,0 +1,108 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from grid_map import GridMap, as_grid_map
+from heuristic_cache import heuristic_cache
+
+
+class SharedTables(object):
+    """Map and heuristic tables published once by the parent process through shared memory.
+
+    The parent process calls SharedTables.publish(), which copies the occupancy, the neighbor table and the heuristic
+    table of every goal into one shared memory block. The returned object is small and can be passed to worker
+    processes, which call attach() to get a GridMap and heuristic tables that are views on the shared block (no copies
+    and no recomputation in the workers).
+
+    Layout of the shared block: heuristics (int32, goals x rows x columns), neighbor table (int32, cells x 4),
+    occupancy (bool, rows x columns).
+    """
+
+    def __init__(self, name, rows, columns, goals):
+        """Use SharedTables.publish() to create the shared tables.
+
+        :param name: name of the shared memory block
+        :param rows: number of rows of the map
+        :param columns: number of columns of the map
+        :param goals: list of goal locations, in the order of the heuristic tables in the shared block
+        """
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.goals = goals
+
+        self._shm = None
+
+    @classmethod
+    def publish(cls, my_map, goals):
+        """Creates the shared block with the map and the heuristic tables of all goals (taken from the heuristic cache).
+
+        :param my_map: the map
+        :param goals: all goal locations for which the heuristic table is shared
+        """
+        grid = as_grid_map(my_map)
+        goals = list(dict.fromkeys((int(goal[0]), int(goal[1])) for goal in goals))  # unique, in order
+
+        tables = cls(None, grid.rows, grid.columns, goals)
+        tables._shm = shared_memory.SharedMemory(create=True, size=max(tables._size(), 1))
+        tables.name = tables._shm.name
+
+        heuristics, neighbor_table, occupancy = tables._views()
+        for i, goal in enumerate(goals):
+            heuristics[i] = heuristic_cache.get(grid, goal)
+        neighbor_table[:] = grid.neighbor_table
+        occupancy[:] = grid.occupancy
+
+        return tables
+
+    def attach(self) -> GridMap:
+        """Attaches to the shared block (in a worker process).
+
+        The heuristic tables are added to the process wide heuristic cache, so all solvers use the shared tables.
+
+        :return: the map as GridMap backed by the shared block
+        """
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.name)
+
+        heuristics, neighbor_table, occupancy = self._views()
+        grid = GridMap(occupancy, neighbor_table=neighbor_table)
+        for i, goal in enumerate(self.goals):
+            heuristic_cache.add(grid, goal, heuristics[i], pin=True)
+
+        return grid
+
+    def close(self):
+        """Closes the access to the shared block in this process."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """Frees the shared block, should be called once by the parent process after all workers are done."""
+        shm = self._shm if self._shm is not None else shared_memory.SharedMemory(name=self.name)
+        shm.close()
+        shm.unlink()
+        self._shm = None
+
+    def _shapes(self):
+        return [(np.int32, (len(self.goals), self.rows, self.columns)),
+                (np.int32, (self.rows * self.columns, 4)),
+                (np.bool_, (self.rows, self.columns))]
+
+    def _size(self) -> int:
+        return sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for dtype, shape in self._shapes())
+
+    def _views(self) -> list:
+        views = []
+        offset = 0
+        for dtype, shape in self._shapes():
+            views.append(np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=offset))
+            offset += views[-1].nbytes
+        return views
+
+    def __getstate__(self):
+        # the handle of the shared block is not sent to other processes, they attach by name
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        return state
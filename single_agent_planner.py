@@ -1,6 +1,14 @@
 import heapq
+import math
 import time as timer
 
+import numpy as np
+
+from grid_map import as_grid_map
+
+# heuristic value of cells from which the goal cannot be reached (and of obstacles)
+UNREACHABLE = np.iinfo(np.int32).max
+
 
 def move(loc, dir):
     directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
@@ -15,49 +23,274 @@ def get_sum_of_cost(paths):
 
 
 def compute_heuristics(my_map, goal):
-    # Use Dijkstra to build a shortest-path tree rooted at the goal location
-    open_list = []
-    closed_list = dict()
-    root = {'loc': goal, 'cost': 0}
-    heapq.heappush(open_list, (root['cost'], goal, root))
-    closed_list[goal] = root
-    while len(open_list) > 0:
-        (cost, loc, curr) = heapq.heappop(open_list)
-        for dir in range(4):
-            child_loc = move(loc, dir)
-            child_cost = cost + 1
-            if child_loc[0] < 0 or child_loc[0] >= len(my_map) \
-               or child_loc[1] < 0 or child_loc[1] >= len(my_map[0]):
-               continue
-            if my_map[child_loc[0]][child_loc[1]]:
-                continue
-            child = {'loc': child_loc, 'cost': child_cost}
-            if child_loc in closed_list:
-                existing_node = closed_list[child_loc]
-                if existing_node['cost'] > child_cost:
-                    closed_list[child_loc] = child
-                    # open_list.delete((existing_node['cost'], existing_node['loc'], existing_node))
-                    heapq.heappush(open_list, (child_cost, child_loc, child))
-            else:
-                closed_list[child_loc] = child
-                heapq.heappush(open_list, (child_cost, child_loc, child))
+    """Computes the shortest path distance from every cell to the goal location.
+
+    All edges have cost 1, so instead of Dijkstra a breadth-first wavefront is grown from the goal. Every wave expands the
+    complete frontier at once using the neighbor table of the map.
+
+    :param my_map: the map (GridMap or list of lists)
+    :param goal: the (row, column) goal location
+
+    :return: int32 array with the shape of the map, h_values[loc] (or h_values.item(cell) with a flat cell index) is the
+    distance to the goal, or UNREACHABLE if the goal cannot be reached from that cell.
+    """
+    grid = as_grid_map(my_map)
+    h_values = np.full(grid.num_cells, UNREACHABLE, dtype=np.int32)
+
+    frontier = np.array([grid.index(goal)])
+    h_values[frontier] = 0
+    distance = 0
+    while frontier.size > 0:
+        distance += 1
+        candidates = grid.neighbor_table[frontier].ravel()
+        candidates = candidates[candidates >= 0]  # -1 marks moves into obstacles or out of the map
+        frontier = np.unique(candidates[h_values[candidates] == UNREACHABLE])
+        h_values[frontier] = distance
+
+    return h_values.reshape(grid.rows, grid.columns)
 
-    # build the heuristics table
-    h_values = dict()
-    for loc, node in closed_list.items():
-        h_values[loc] = node['cost']
-    return h_values
 
+def get_safe_intervals(constrained_times, block_time=None) -> list:
+    """Returns the safe intervals of a cell: the maximal time intervals in which the cell is not constrained.
 
-def build_constraint_table(constraints: list, agent: int) -> dict:
-    """" Creates a time keyed dictionary with all the constraints belonging to a certain agent. Can be vertex or edge
-    constraints. The constraint types are differentiated by length of 'loc' keyed items in the constraints input
-    list. So the returned dictionary has the timestep as keys, each with a list of constraints.
+    :param constrained_times: the timesteps at which the cell is constrained
+    :param block_time: timestep from which the cell is blocked forever, or None
+
+    :return: sorted list of (first timestep, last timestep) tuples, the last timestep of the final interval is math.inf
+    if the cell is never blocked.
+    """
+    end = math.inf if block_time is None else block_time - 1
+
+    intervals = []
+    start = 0
+    for time in sorted(constrained_times):
+        if time > end:
+            break
+        if time > start:
+            intervals.append((start, time - 1))
+        start = time + 1
+
+    if start <= end:
+        intervals.append((start, end))
+
+    return intervals
+
+class ConstraintTable(object):
+    """Index of the constraints of one agent, so that every constraint check is a constant time lookup.
+
+    Locations are stored as flat cell indices (see GridMap):
+        vertex      - {timestep: set of cells the agent may not occupy at that timestep}
+        edge        - {timestep: set of (from cell, to cell) moves the agent may not make arriving at that timestep}
+        goal_blocks - {cell: timestep from which the cell is blocked forever}, e.g. the goal of an agent that finished
+        positive    - {timestep: cell the agent has to occupy at that timestep}, from positive constraints (disjoint
+                      splitting). A positive edge constraint is stored as positive constraints on both of its cells.
+
+    The following are maintained while adding constraints:
+        vertex_times     - {cell: set of timesteps at which there is a vertex constraint on the cell}
+        last_constrained - {cell: last timestep at which there is a vertex constraint on the cell}
+        horizon          - the last timestep at which any constraint starts. After this timestep the constraints do not
+                           change anymore, so states that only differ in time beyond it are equivalent.
+    """
+
+    def __init__(self):
+        self.vertex = dict()
+        self.edge = dict()
+        self.goal_blocks = dict()
+        self.positive = dict()
+
+        self.vertex_times = dict()
+        self.last_constrained = dict()
+        self.horizon = 0
+
+    def add_vertex(self, cell: int, time: int):
+        self.vertex.setdefault(time, set()).add(cell)
+        self.vertex_times.setdefault(cell, set()).add(time)
+        self.last_constrained[cell] = max(time, self.last_constrained.get(cell, time))
+        self.horizon = max(self.horizon, time)
+
+    def add_edge(self, from_cell: int, to_cell: int, time: int):
+        self.edge.setdefault(time, set()).add((from_cell, to_cell))
+        self.horizon = max(self.horizon, time)
+
+    def add_goal_block(self, cell: int, start_time: int):
+        self.goal_blocks[cell] = min(start_time, self.goal_blocks.get(cell, start_time))
+        self.horizon = max(self.horizon, start_time)
+
+    def add_positive_vertex(self, cell: int, time: int):
+        # two different positive constraints at the same timestep cannot both be met: -1 matches no cell at all
+        self.positive[time] = cell if self.positive.get(time, cell) == cell else -1
+        self.horizon = max(self.horizon, time)
+
+    def add_positive_edge(self, from_cell: int, to_cell: int, time: int):
+        self.add_positive_vertex(from_cell, time - 1)
+        self.add_positive_vertex(to_cell, time)
+
+    def is_constrained(self, curr_cell: int, next_cell: int, next_time: int) -> bool:
+        cell = self.positive.get(next_time)
+        if cell is not None and cell != next_cell:
+            return True
+
+        cells = self.vertex.get(next_time)
+        if cells is not None and next_cell in cells:
+            return True
+
+        moves = self.edge.get(next_time)
+        if moves is not None and (curr_cell, next_cell) in moves:
+            return True
+
+        start_time = self.goal_blocks.get(next_cell)
+        return start_time is not None and start_time <= next_time
+
+    def goal_constrained(self, goal_cell: int, curr_time: int) -> bool:
+        if goal_cell in self.goal_blocks:
+            return True  # staying at the goal forever is not possible if the goal cell gets blocked at some point
+
+        if any(time > curr_time and cell != goal_cell for time, cell in self.positive.items()):
+            return True  # the agent still has to be somewhere else later on
+
+        return self.last_constrained.get(goal_cell, -1) > curr_time
+
+    def safe_intervals(self, cell: int) -> list:
+        """Returns the safe intervals of the cell, see get_safe_intervals."""
+        constrained_times = self.vertex_times.get(cell, ())
+        if len(self.positive) > 0:  # the cell is also blocked whenever the agent has to be in another cell
+            constrained_times = set(constrained_times) | {time for time, positive_cell in self.positive.items()
+                                                          if positive_cell != cell}
+        return get_safe_intervals(constrained_times, self.goal_blocks.get(cell))
+
+
+class ReservationTable(object):
+    """Space-time reservations of the paths that are already planned, shared by all agents that are planned after them.
+
+    Every path is written into the table once (see reserve_path) and all later agents query it directly. The table has
+    the same interface as ConstraintTable, so it can be passed to a_star as constraint_table:
+        vertex - {(cell, timestep): agent occupying the cell at that timestep}
+        edge   - {(from cell, to cell, timestep): agent making that move arriving at that timestep}
+        parked - {cell: timestep from which an agent waits at the cell (its goal) forever}
+    """
+
+    def __init__(self, my_map):
+        self.grid = as_grid_map(my_map)
+
+        self.vertex = dict()
+        self.edge = dict()
+        self.parked = dict()
+
+        self.vertex_times = dict()
+        self.last_constrained = dict()
+        self.horizon = 0
+
+    def reserve_path(self, path: list, agent):
+        """Reserves all cells and moves of the path of the agent, and its goal from its arrival on."""
+        cells = [int(self.grid.index(loc)) for loc in path]
+
+        for time, cell in enumerate(cells):
+            self.vertex[(cell, time)] = agent
+            self.vertex_times.setdefault(cell, set()).add(time)
+            if time > 0:
+                self.edge[(cells[time - 1], cell, time)] = agent
+            self.last_constrained[cell] = max(time, self.last_constrained.get(cell, time))
+
+        self.parked[cells[-1]] = len(cells) - 1
+        self.horizon = max(self.horizon, len(cells) - 1)
+
+    def is_constrained(self, curr_cell: int, next_cell: int, next_time: int) -> bool:
+        if (next_cell, next_time) in self.vertex:  # vertex collision
+            return True
+
+        if (next_cell, curr_cell, next_time) in self.edge:  # edge collision (swapping locations)
+            return True
+
+        park_time = self.parked.get(next_cell)
+        return park_time is not None and park_time <= next_time
+
+    def goal_constrained(self, goal_cell: int, curr_time: int) -> bool:
+        if goal_cell in self.parked:
+            return True
+
+        return self.last_constrained.get(goal_cell, -1) > curr_time
+
+    def safe_intervals(self, cell: int) -> list:
+        """Returns the safe intervals of the cell, see get_safe_intervals."""
+        return get_safe_intervals(self.vertex_times.get(cell, ()), self.parked.get(cell))
+
+
+class ConflictAvoidanceTable(object):
+    """Conflict avoidance table (CAT): the paths of the other agents, used to count the collisions a move would cause.
+    Unlike constraints, the collisions are not forbidden but only avoided when that does not cost anything extra.
+        vertex - {(cell, timestep): number of agents occupying the cell at that timestep}
+        edge   - {(from cell, to cell, timestep): number of agents making that move arriving at that timestep}
+        parked - {cell: timesteps from which agents wait at the cell (their goal) forever}
+        fingerprint - sum of the hashes of the paths (modulo 2^64), 0 when the table is empty
+    """
+
+    def __init__(self, my_map, paths=()):
+        """
+        :param my_map: the map (GridMap or list of lists)
+        :param paths: the paths of the other agents
+        """
+        self.grid = as_grid_map(my_map)
+
+        self.vertex = dict()
+        self.edge = dict()
+        self.parked = dict()
+        self.horizon = 0
+        self.fingerprint = 0
+
+        for path in paths:
+            self.add_path(path)
+
+    def add_path(self, path: list):
+        cells = [int(self.grid.index(loc)) for loc in path]
+
+        for time, cell in enumerate(cells):
+            self.vertex[(cell, time)] = self.vertex.get((cell, time), 0) + 1
+            if time > 0 and cells[time - 1] != cell:
+                move = (cells[time - 1], cell, time)
+                self.edge[move] = self.edge.get(move, 0) + 1
+
+        self.parked.setdefault(cells[-1], []).append(len(cells) - 1)
+        self.horizon = max(self.horizon, len(cells) - 1)
+        self.fingerprint = (self.fingerprint + hash(tuple(cells))) % 2 ** 64
+
+    def remove_path(self, path: list):
+        """Removes a path added before with add_path (the horizon is kept)."""
+        cells = [int(self.grid.index(loc)) for loc in path]
+
+        for time, cell in enumerate(cells):
+            self.vertex[(cell, time)] -= 1
+            if time > 0 and cells[time - 1] != cell:
+                self.edge[(cells[time - 1], cell, time)] -= 1
+
+        self.parked[cells[-1]].remove(len(cells) - 1)
+        self.fingerprint = (self.fingerprint - hash(tuple(cells))) % 2 ** 64
+
+    def conflicts(self, curr_cell: int, next_cell: int, next_time: int) -> int:
+        """Returns the number of collisions with the other agents of moving from curr_cell to next_cell."""
+        count = self.vertex.get((next_cell, next_time), 0)
+        if curr_cell != next_cell:
+            count += self.edge.get((next_cell, curr_cell, next_time), 0)  # swapping locations
+
+        for park_time in self.parked.get(next_cell, ()):
+            if park_time < next_time:  # at park_time itself the agent is already counted in vertex
+                count += 1
+        return count
+
+
+def build_constraint_table(constraints: list, agent: int, my_map) -> ConstraintTable:
+    """" Creates the constraint table with all the constraints belonging to a certain agent. Can be vertex or edge
+    constraints. The constraint types are differentiated by the 'loc' keyed items in the constraints input list: a
+    location tuple for vertex constraints and a list of two locations for edge constraints. Constraints with timestep
+    -1 block their location from their 'start_time' on forever.
+
+    Constraints with 'positive' set (disjoint splitting) force the agent to be at the location (or to traverse the edge)
+    at the timestep. The positive constraints of other agents are turned into negative constraints for this agent.
 
     :param constraints - the list of constrained dictionaries.
     :param agent - the id of the agent for which the constraint table must be created
+    :param my_map - the map (GridMap or list of lists), used to index the constraints by cell
 
-    :return The time-keyed constraint dictionary for the specific agent.
+    :return The ConstraintTable for the specific agent.
     """
     ##############################
     # Task 1.2/1.3: Return a table that contains the list of constraints of
@@ -65,16 +298,37 @@ def build_constraint_table(constraints: list, agent: int) -> dict:
     #               for a more efficient constraint violation check in the 
     #               is_constrained function.
 
-    constraint_dict = {}
+    grid = as_grid_map(my_map)
+    constraint_table = ConstraintTable()
 
     for constraint in constraints:
-        if constraint['agent'] == agent:
-            if constraint['timestep'] not in constraint_dict.keys():  # if constraint timestep not in dict, add it
-                constraint_dict[constraint['timestep']] = [constraint]
-            else:  # if constraint timestep already in dict, append to the list of constraints.
-                constraint_dict[constraint['timestep']].append(constraint)
+        loc = constraint['loc']
+        time = constraint['timestep']
+
+        if constraint.get('positive', False):
+            if constraint['agent'] == agent and isinstance(loc[0], tuple):
+                constraint_table.add_positive_edge(int(grid.index(loc[0])), int(grid.index(loc[1])), time)
+            elif constraint['agent'] == agent:
+                constraint_table.add_positive_vertex(int(grid.index(loc)), time)
+            elif isinstance(loc[0], tuple):  # the other agent traverses the edge, so its cells and the edge are taken
+                constraint_table.add_vertex(int(grid.index(loc[0])), time - 1)
+                constraint_table.add_vertex(int(grid.index(loc[1])), time)
+                constraint_table.add_edge(int(grid.index(loc[1])), int(grid.index(loc[0])), time)
+            else:
+                constraint_table.add_vertex(int(grid.index(loc)), time)
+            continue
+
+        if constraint['agent'] != agent:
+            continue
+
+        if constraint['timestep'] == -1:  # vertex constraint due to an already finished agent
+            constraint_table.add_goal_block(int(grid.index(loc)), constraint['start_time'])
+        elif isinstance(loc[0], tuple):  # edge constraint
+            constraint_table.add_edge(int(grid.index(loc[0])), int(grid.index(loc[1])), constraint['timestep'])
+        else:  # vertex constraint
+            constraint_table.add_vertex(int(grid.index(loc)), constraint['timestep'])
 
-    return constraint_dict
+    return constraint_table
 
 
 def get_location(path, time):
@@ -86,24 +340,47 @@ def get_location(path, time):
         return path[-1]  # wait at the goal location
 
 
-def get_path(goal_node):
+class Node(object):
+    """Space-time node of the low-level search. Uses __slots__ since a node is created for every generated state."""
+
+    __slots__ = ('cell', 'time', 'g_val', 'h_val', 'parent', 'conflicts')
+
+    def __init__(self, cell: int, time: int, g_val: int, h_val: int, parent, conflicts: int = 0):
+        """
+        :param cell: flat cell index of the location of the node (see GridMap)
+        :param time: timestep of the node
+        :param g_val: cost of the path to this node
+        :param h_val: heuristic value of the location
+        :param parent: parent Node, None for the root node
+        :param conflicts: number of collisions of the path to this node with the other agents (see
+                          ConflictAvoidanceTable)
+        """
+        self.cell = cell
+        self.time = time
+        self.g_val = g_val
+        self.h_val = h_val
+        self.parent = parent
+        self.conflicts = conflicts
+
+
+def get_path(goal_node, grid):
     path = []
     curr = goal_node
     while curr is not None:
-        path.append(curr['loc'])
-        curr = curr['parent']
+        path.append(grid.locations[curr.cell])
+        curr = curr.parent
     path.reverse()
     return path
 
 
-def is_constrained(curr_loc: tuple, next_loc: tuple, next_time: int, constraint_table: dict) -> bool:
+def is_constrained(curr_cell: int, next_cell: int, next_time: int, constraint_table: ConstraintTable) -> bool:
     """"
     Checks if the agents intended move is allowed for a specific state or not.
 
-    :param curr_loc: the current location of the agent
-    :param next_loc: the aimed location for the agent
+    :param curr_cell: the current cell of the agent
+    :param next_cell: the aimed cell for the agent
     :param next_time: the next timestep
-    :param constraint_table: the time-keyed dictionary with agent constraints.
+    :param constraint_table: the ConstraintTable of the agent, see build_constraint_table.
 
     :return boolean
     """
@@ -116,59 +393,38 @@ def is_constrained(curr_loc: tuple, next_loc: tuple, next_time: int, constraint_
     # Edge constraints are defined as:  not allowed to be at constraint['loc'][1] at time step constraint['time']
     # coming from constraint['loc'][0]
 
-    try:
-        for constraint in constraint_table[next_time]:  # loop through all constraints active for the next_time
-            if constraint['loc'] == next_loc or constraint['loc'] == [curr_loc, next_loc]:
-                # Check if agents move is constrained via vertex constrained or edge constraint.
-                return True
-    except KeyError:  # if there are no constraints for the next_time: pass (and thus return false)
-        pass
-
-    try:  # check if there is a vertex constraint due to already finished agents
-        for constraint in constraint_table[-1]:
-            if constraint['start_time'] <= next_time and constraint['loc'] == next_loc:
-                return True
-    except KeyError:
-        pass
-
-    return False
+    return constraint_table.is_constrained(curr_cell, next_cell, next_time)
 
 
-def push_node(open_list, node):
-    hashv = hash(repr(node))
-    heapq.heappush(open_list, (node['g_val'] + node['h_val'], node['h_val'], node['loc'], hashv, node))
+def push_node(open_list, node, tie_breaker):
+    """Pushes a node on the open list ordered by f-value, then number of collisions, then h-value and then the
+    tie_breaker (a unique integer)."""
+    heapq.heappush(open_list, (node.g_val + node.h_val, node.conflicts, node.h_val, tie_breaker, node))
 
 
 def pop_node(open_list):
-    _, _, _, _, curr = heapq.heappop(open_list)
-    return curr
+    return heapq.heappop(open_list)[-1]
 
 
-def compare_nodes(n1, n2):
-    """Return true if n1 is better than n2."""
-    return n1['g_val'] + n1['h_val'] < n2['g_val'] + n2['h_val']
-
-
-def goal_constrained(goal_loc, curr_time, constraint_table):
+def goal_constrained(goal_cell, curr_time, constraint_table):
     """" The goal is constrained if there is any constraint in the constraint table at the agent's goal location, at a
     time step later than the current time.
     """
 
-    keys = [key for key in constraint_table.keys() if key > curr_time]
-
-    for key in keys:
-        if goal_loc in [constraint['loc'] for constraint in constraint_table[key]]:
-            return True
-
-    return False
+    return constraint_table.goal_constrained(goal_cell, curr_time)
 
 
-def a_star(my_map, start_loc, goal_loc, h_values, agent, constraints):
-    """ my_map      - binary obstacle map
+def a_star(my_map, start_loc, goal_loc, h_values, agent, constraints, constraint_table=None,
+           conflict_avoidance_table=None):
+    """ my_map      - binary obstacle map (GridMap or list of lists)
         start_loc   - start position
         goal_loc    - goal position
+        h_values    - heuristic table of the goal location, see compute_heuristics
         agent       - the agent that is being re-planned
         constraints - constraints defining where robot should or cannot go at each time step
+        constraint_table - prebuilt constraint table (e.g. a ReservationTable) used instead of the constraints
+        conflict_avoidance_table - ConflictAvoidanceTable of the paths of the other agents: of all shortest paths, the
+                      one with the fewest collisions with them is returned
 
         :return list of nodes that form the path found
     """
@@ -177,73 +433,74 @@ def a_star(my_map, start_loc, goal_loc, h_values, agent, constraints):
     # Task 1.1: Extend the A* search to search in the space-time domain
     #           rather than space domain, only.
 
-    constraint_dict = build_constraint_table(constraints=constraints, agent=agent)
+    grid = as_grid_map(my_map)
+    if constraint_table is None:
+        constraint_table = build_constraint_table(constraints=constraints, agent=agent, my_map=grid)
+
+    start_cell = int(grid.index(start_loc))
+    goal_cell = int(grid.index(goal_loc))
+    h_value = h_values.item(start_cell)
+    if h_value == UNREACHABLE:
+        return None  # the goal cannot be reached from the start location at all
+
+    # From time_horizon on nothing changes anymore in the constraints, so a state (cell, time) with time > time_horizon
+    # is equivalent to (cell, time_horizon). Collapsing those states keeps the search space finite: if the open list
+    # runs empty there is no solution, no ad-hoc cutoff on the path length is needed.
+    time_horizon = constraint_table.horizon + 1
+    if conflict_avoidance_table is not None:
+        # the collisions also change until the last other agent arrived at its goal
+        time_horizon = max(time_horizon, conflict_avoidance_table.horizon + 1)
 
     open_list = []
-    closed_list = dict()
-    earliest_goal_timestep = 0
-    h_value = h_values[start_loc]
-    root = {'loc': start_loc, 'g_val': 0, 'h_val': h_value, 'parent': None, 'time': 0}
-    push_node(open_list, root)
+    # closed_list maps every generated state (cell, min(time, time_horizon)) to its lowest (g-value, collisions) found
+    # so far. Every action costs 1, so before time_horizon the g-value of a state equals its time and the first time a
+    # state is generated it is generated with its optimal cost: a later duplicate is only kept if it collides less.
+    closed_list = {(start_cell, 0): (0, 0)}
+    num_generated = 0
 
-    start_time = timer.process_time()
+    root = Node(start_cell, 0, 0, h_value, None)
+    push_node(open_list, root, num_generated)
 
+    neighbors = grid.neighbors
+    start_time = timer.process_time()
 
     while len(open_list) > 0 and timer.process_time() - start_time < 1.0:
         curr = pop_node(open_list)
-        #print('hey', len(open_list), curr['g_val'], root['h_val'])
 
-        if curr['g_val'] > 2 * root['h_val'] + 10:
-            # if g_val exceeds root's h_val by a lot, the path cannot be found and the code should stop.
-            break
+        if closed_list[(curr.cell, min(curr.time, time_horizon))] < (curr.g_val, curr.conflicts):
+            continue  # a better path to this (collapsed) state was found after this node was pushed
 
         #############################
         # Task 1.4: Adjust the goal test condition to handle goal constraints
-        if curr['loc'] == goal_loc and not goal_constrained(goal_loc, curr['time'], constraint_dict):
-            return get_path(curr)
-
-        for dir in range(5):
-            if dir < 4:
-                child_loc = move(curr['loc'], dir)
-
-                # filters out obstacles or out-of-bounds nodes:
-                try:
-                    if my_map[child_loc[0]][child_loc[1]] or child_loc[0] < 0 or child_loc[1] < 0:
-                        # if this is true, child loc is either an obstacle or outside of map on left or top side
-                        continue
-                except IndexError:  # index error means child_loc is outside of map on lower or right side
-                    continue
-
-                child = {'loc': child_loc,
-                         'g_val': curr['g_val'] + 1,
-                         'h_val': h_values[child_loc],
-                         'parent': curr,
-                         'time': curr['time'] + 1}
+        if curr.cell == goal_cell and not goal_constrained(goal_cell, curr.time, constraint_table):
+            return get_path(curr, grid)
+
+        child_time = curr.time + 1
+        child_g_val = curr.g_val + 1
+
+        # the precomputed neighbor table only contains free cells inside the map, the last option is waiting in place
+        for child_cell in neighbors[curr.cell] + (curr.cell,):
+            if conflict_avoidance_table is None:
+                conflicts = 0
             else:
-                child_loc = curr['loc']
-                child = {'loc': child_loc,
-                         'g_val': curr['g_val'] + 1,
-                         'h_val': h_values[child_loc],
-                         'parent': curr,
-                         'time': curr['time'] + 1}
+                conflicts = curr.conflicts + conflict_avoidance_table.conflicts(curr.cell, child_cell, child_time)
+
+            state = (child_cell, min(child_time, time_horizon))
+            existing = closed_list.get(state)
+            if existing is not None and existing <= (child_g_val, conflicts):
+                continue
 
             # Only push child node in open_list if child note doesn't violate constraints:
-            if not is_constrained(curr_loc=curr['loc'],
-                                  next_loc=child['loc'],
-                                  next_time=child['time'],
-                                  constraint_table=constraint_dict):
-                if (child['loc'], child['time']) in closed_list:
-                    existing_node = closed_list[(child['loc'], child['time'])]
-
-                    if compare_nodes(child, existing_node):
-                        # Mentioned in report: default closed list implementation is faulty so line is commented out.
-                        # closed_list[(child['loc'], child['time'])] = child
-                        push_node(open_list, child)
-                else:
-                    # Mentioned in report: default closed list implementation is faulty so line is commented out.
-                    # closed_list[(child['loc'], child['time'])] = child
-                    push_node(open_list, child)
-
-        closed_list[(curr['loc'], curr['time'])] = curr
+            if is_constrained(curr_cell=curr.cell,
+                              next_cell=child_cell,
+                              next_time=child_time,
+                              constraint_table=constraint_table):
+                continue
+
+            closed_list[state] = (child_g_val, conflicts)
+            num_generated += 1
+            push_node(open_list,
+                      Node(child_cell, child_time, child_g_val, h_values.item(child_cell), curr, conflicts),
+                      num_generated)
 
     return None  # Failed to find solutions
@@ -0,0 +1,144 @@
+import heapq
+import math
+import time as timer
+
+from grid_map import as_grid_map
+from single_agent_planner import build_constraint_table, UNREACHABLE
+
+
+class SIPPNode(object):
+    """Node of the SIPP search: a cell, one of its safe intervals and the earliest arrival time in that interval."""
+
+    __slots__ = ('cell', 'interval', 'time', 'h_val', 'parent', 'conflicts')
+
+    def __init__(self, cell: int, interval: int, time: int, h_val: int, parent, conflicts: int = 0):
+        """
+        :param cell: flat cell index of the location of the node (see GridMap)
+        :param interval: index of the safe interval of the cell
+        :param time: (earliest) arrival time at the cell, which is also the g-value of the node
+        :param h_val: heuristic value of the location
+        :param parent: parent SIPPNode, None for the root node
+        :param conflicts: number of collisions of the path to this node with the other agents, including the waiting
+                          before the move into the cell (see ConflictAvoidanceTable)
+        """
+        self.cell = cell
+        self.interval = interval
+        self.time = time
+        self.h_val = h_val
+        self.parent = parent
+        self.conflicts = conflicts
+
+
+def get_sipp_path(goal_node, grid):
+    """Builds the path of the goal node, waiting in the parent's cell until the departure to the next cell."""
+    nodes = []
+    curr = goal_node
+    while curr is not None:
+        nodes.append(curr)
+        curr = curr.parent
+    nodes.reverse()
+
+    path = []
+    for node, next_node in zip(nodes, nodes[1:]):
+        path += [grid.locations[node.cell]] * (next_node.time - node.time)
+    path.append(grid.locations[goal_node.cell])
+    return path
+
+
+def sipp(my_map, start_loc, goal_loc, h_values, agent, constraints, constraint_table=None,
+         conflict_avoidance_table=None):
+    """ Safe Interval Path Planning: finds the same (optimal) paths as a_star, but searches over the safe intervals of
+    every cell instead of over every (cell, timestep). All waiting in a cell is done within one node, so long waits
+    (e.g. behind many parked agents) do not create a node per timestep.
+
+        my_map      - binary obstacle map (GridMap or list of lists)
+        start_loc   - start position
+        goal_loc    - goal position
+        h_values    - heuristic table of the goal location, see compute_heuristics
+        agent       - the agent that is being re-planned
+        constraints - constraints defining where robot should or cannot go at each time step
+        constraint_table - prebuilt constraint table (e.g. a ReservationTable) used instead of the constraints
+        conflict_avoidance_table - ConflictAvoidanceTable of the paths of the other agents: like in a_star, ties
+                      between nodes with the same f-value are broken by the fewest collisions. A node is kept per safe
+                      interval with its earliest arrival, so among paths of the same cost this is a best effort.
+
+        :return list of nodes that form the path found
+    """
+
+    grid = as_grid_map(my_map)
+    if constraint_table is None:
+        constraint_table = build_constraint_table(constraints=constraints, agent=agent, my_map=grid)
+
+    start_cell = int(grid.index(start_loc))
+    goal_cell = int(grid.index(goal_loc))
+    h_value = h_values.item(start_cell)
+    if h_value == UNREACHABLE:
+        return None  # the goal cannot be reached from the start location at all
+
+    safe_intervals = dict()  # the safe intervals of every cell visited, computed once per cell
+
+    def get_intervals(cell):
+        intervals = safe_intervals.get(cell)
+        if intervals is None:
+            intervals = safe_intervals[cell] = constraint_table.safe_intervals(cell)
+        return intervals
+
+    start_intervals = get_intervals(start_cell)
+    if len(start_intervals) == 0 or start_intervals[0][0] > 0:
+        return None  # the start location is constrained at timestep 0
+
+    open_list = []
+    # (cell, safe interval) -> (earliest arrival time, fewest collisions at that time) found so far
+    closed_list = {(start_cell, 0): (0, 0)}
+    num_generated = 0
+
+    heapq.heappush(open_list, (h_value, 0, h_value, num_generated, SIPPNode(start_cell, 0, 0, h_value, None)))
+
+    neighbors = grid.neighbors
+    start_time = timer.process_time()
+
+    while len(open_list) > 0 and timer.process_time() - start_time < 1.0:
+        curr = heapq.heappop(open_list)[-1]
+
+        if closed_list[(curr.cell, curr.interval)] < (curr.time, curr.conflicts):
+            continue  # a better arrival in this safe interval was found after this node was pushed
+
+        # the agent can stay at the goal forever if it arrives in the last, unbounded safe interval of the goal
+        interval_end = get_intervals(curr.cell)[curr.interval][1]
+        if curr.cell == goal_cell and interval_end == math.inf:
+            return get_sipp_path(curr, grid)
+
+        for child_cell in neighbors[curr.cell]:
+            for child_interval, (low, high) in enumerate(get_intervals(child_cell)):
+                if low > interval_end + 1:
+                    break  # the agent has to leave the current cell before this interval starts
+                if high < curr.time + 1:
+                    continue
+
+                # wait in the current cell until the child interval starts, and further while the move is constrained
+                # (edge constraints), as long as the agent can stay in the current cell and arrive in the interval.
+                latest_arrival = min(interval_end + 1, high)
+                arrival = max(curr.time + 1, low)
+                while arrival <= latest_arrival and constraint_table.is_constrained(curr.cell, child_cell, arrival):
+                    arrival += 1
+                if arrival > latest_arrival:
+                    continue
+
+                conflicts = curr.conflicts
+                if conflict_avoidance_table is not None:
+                    for wait_time in range(curr.time + 1, arrival):
+                        conflicts += conflict_avoidance_table.conflicts(curr.cell, curr.cell, wait_time)
+                    conflicts += conflict_avoidance_table.conflicts(curr.cell, child_cell, arrival)
+
+                state = (child_cell, child_interval)
+                existing = closed_list.get(state)
+                if existing is not None and existing <= (arrival, conflicts):
+                    continue
+
+                closed_list[state] = (arrival, conflicts)
+                num_generated += 1
+                h_val = h_values.item(child_cell)
+                heapq.heappush(open_list, (arrival + h_val, conflicts, h_val, num_generated,
+                                           SIPPNode(child_cell, child_interval, arrival, h_val, curr, conflicts)))
+
+    return None  # Failed to find solutions